@@ -4,3 +4,17 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import (
+            authentication,
+            images,
+            relations,
+            short_links,
+            versions,
+        )
+        versions.connect_signals()
+        relations.connect_signals()
+        images.connect_signals()
+        authentication.connect_signals()
+        short_links.connect_signals()
@@ -0,0 +1,343 @@
+"""Асинхронные версии горячих эндпоинтов для запуска под ASGI.
+
+Подключаются вместо обычных view, когда ASYNC_VIEWS включён (так
+делает config.asgi): список и карточка рецепта, поиск ингредиентов,
+выгрузка списка покупок и переходы по коротким ссылкам. Ответы
+совпадают с ответами DRF-версий, но запрос не занимает поток на время
+обращений к кэшу и базе. Остальные методы (запись, HEAD, OPTIONS) и
+редкие варианты запросов к рецептам (?fields=, ?cursor=, другой формат,
+ошибки) передаются DRF-view.
+Остальные view синхронные: Django выполняет их в пуле потоков.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.paginator import InvalidPage, Page
+from django.http import (
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import redirect
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import (
+    APIException,
+    NotAuthenticated,
+    NotFound,
+)
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from recipes.models import Ingredient, Recipe
+from utils.constants import SHORT_LINK_CACHE_MAX_AGE
+
+from .authentication import aauthenticate
+from .cards import aget_recipe_cards
+from .mixins import make_etag, patch_conditional_headers
+from .pagination import CustomPageNumberPagination
+from .relations import (
+    UserRelations,
+    annotate_flags,
+    filter_related,
+    relation_version_key,
+)
+from .renderers import CSVRenderer, PlainTextRenderer
+from .rows import MINI_RECIPE_FIELDS
+from .search import aget_ingredient_index
+from .shopping_list import aexport, ashopping_list
+from .serializers import RecipeReadSerializer
+from .short_links import arecipe_exists, decode
+from .versions import aget_versions, model_version_key
+from .views import RecipeViewSet
+
+User = get_user_model()
+
+# Как у JSONRenderer DRF: компактно и без экранирования кириллицы.
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+EXPORT_RENDERERS = [PlainTextRenderer(), CSVRenderer(), JSONRenderer()]
+# Параметры запроса к рецептам, которые обрабатывает только DRF-view.
+SYNC_PARAMS = {'fields', 'omit', 'include', 'cursor', 'format'}
+RECIPE_FILTERS = {
+    'author': None,
+    'is_favorited': 'favorites',
+    'is_in_shopping_cart': 'shopping_cart',
+}
+
+
+def error_response(request, exc, renderer=None):
+    """Ошибка в том же виде, что у DRF: через выбранный рендерер."""
+    renderer = renderer or JSONRenderer()
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type += f'; charset={renderer.charset}'
+    response = HttpResponse(
+        renderer.render({'detail': exc.detail}),
+        status=exc.status_code,
+        content_type=content_type,
+    )
+    if exc.status_code == 401:
+        authenticator = api_settings.DEFAULT_AUTHENTICATION_CLASSES[0]()
+        response['WWW-Authenticate'] = authenticator.authenticate_header(
+            request
+        )
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+async def get_user(request):
+    return await aauthenticate(request) or AnonymousUser()
+
+
+async def ingredients(request):
+    """Как IngredientViewSet.list."""
+    try:
+        user = await get_user(request)
+    except APIException as exc:
+        return error_response(request, exc)
+    etag = make_etag(
+        request, JSONRenderer.media_type, user,
+        await aget_versions([model_version_key(Ingredient)]),
+    )
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        limit = request.GET.get('limit')
+        limit = int(limit) if limit and limit.isdigit() else None
+        name = request.GET.get('name', '')
+        index = await aget_ingredient_index()
+        if name and request.GET.get('mode') == 'fuzzy':
+            data = index.fuzzy(name, limit)
+        else:
+            data = index.startswith(name, limit)
+        response = JsonResponse(
+            data, safe=False, json_dumps_params=JSON_PARAMS
+        )
+    patch_conditional_headers(response, etag, user)
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+async def download_shopping_cart(request):
+    """Как RecipeViewSet.download_shopping_cart."""
+    # Как в DRF: сначала выбор формата, затем проверка учётных данных.
+    try:
+        renderer, _ = DefaultContentNegotiation().select_renderer(
+            Request(request), EXPORT_RENDERERS
+        )
+    except Http404:
+        return error_response(request, NotFound(), EXPORT_RENDERERS[0])
+    except APIException as exc:
+        return error_response(request, exc, EXPORT_RENDERERS[0])
+    try:
+        user = await aauthenticate(request)
+        if user is None:
+            raise NotAuthenticated()
+    except APIException as exc:
+        return error_response(request, exc, renderer)
+    response = StreamingHttpResponse(
+        aexport(renderer.format, ashopping_list(user.pk)),
+        content_type=f'{renderer.media_type}; charset=utf-8',
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="shopping_list.{renderer.format}"'
+    )
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+async def redirect_to_recipe(request, recipe_id):
+    if not await arecipe_exists(recipe_id):
+        raise Http404('Рецепт не найден')
+    response = redirect(f'/recipes/{recipe_id}')
+    patch_cache_control(
+        response, public=True, max_age=SHORT_LINK_CACHE_MAX_AGE
+    )
+    return response
+
+
+async def short_link(request, code):
+    recipe_id = decode(code)
+    if recipe_id is None:
+        raise Http404('Рецепт не найден')
+    return await redirect_to_recipe(request, recipe_id)
+
+
+def with_fallback(handler, fallback, sync_params=SYNC_PARAMS):
+    """Асинхронный view: GET-запросы обслуживает handler, а если он
+    вернул None — как и остальные методы и запросы с параметрами из
+    sync_params — DRF-view fallback."""
+    sync_fallback = sync_to_async(fallback)
+    # Как Allow у DRF-view: действия роутера, HEAD и OPTIONS.
+    methods = {*fallback.actions, 'head', 'options'}
+    allow = ', '.join(
+        method.upper() for method in fallback.cls.http_method_names
+        if method in methods
+    )
+
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        response = None
+        if request.method == 'GET' and not sync_params & request.GET.keys():
+            response = await handler(request, *args, **kwargs)
+        if response is None:
+            return await sync_fallback(request, *args, **kwargs)
+        response['Allow'] = allow
+        return response
+
+    return view
+
+
+async def recipe_request(request):
+    """Запрос DRF с пользователем или None, если ответ отдаст DRF."""
+    drf_request = Request(request)
+    renderers = [
+        renderer() for renderer in RecipeViewSet.renderer_classes
+    ]
+    try:
+        renderer, media_type = DefaultContentNegotiation().select_renderer(
+            drf_request, renderers
+        )
+        user = await get_user(request)
+    except (Http404, APIException):
+        return None
+    if media_type != JSONRenderer.media_type:
+        return None
+    drf_request.user = user
+    return drf_request
+
+
+def recipe_version_keys(user):
+    """Ключи версий для ETag, как у RecipeViewSet.get_etag."""
+    keys = [
+        model_version_key(model) for model in RecipeViewSet.versioned_models
+    ]
+    if user.is_authenticated:
+        keys += [
+            relation_version_key(kind, user.pk)
+            for kind in RecipeViewSet.user_relations
+        ]
+    return keys
+
+
+def with_flags(queryset, request):
+    """Подзапросы флагов, как в RecipeViewSet.get_queryset."""
+    user = request.user
+    if user.is_authenticated:
+        queryset = annotate_flags(
+            queryset, user, request._relations,
+            RecipeReadSerializer.Meta.fields,
+        )
+    return queryset
+
+
+def rows_values(queryset):
+    """Строки рецептов, как в RecipeViewSet.filter_queryset."""
+    return queryset.values(
+        *MINI_RECIPE_FIELDS, 'author_id', 'updated_at',
+        *queryset.query.annotations
+    )
+
+
+async def conditional_recipes(request, render):
+    """Ответ 304 по ETag или данные от render(drf_request)."""
+    drf_request = await recipe_request(request)
+    if drf_request is None:
+        return None
+    user = drf_request.user
+    keys = recipe_version_keys(user)
+    versions = await aget_versions(keys)
+    etag = make_etag(request, JSONRenderer.media_type, user, versions)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if user.is_authenticated:
+            # Для флагов в RecipeReadSerializer (см. get_relations);
+            # версии связей уже прочитаны для ETag.
+            drf_request._relations = await UserRelations.aload(
+                user, dict(zip(keys, versions))
+            )
+        data = await render(drf_request)
+        if data is None:
+            return None
+        response = JsonResponse(
+            data, safe=False, json_dumps_params=JSON_PARAMS
+        )
+    patch_conditional_headers(response, etag, user)
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+async def recipe_list(request):
+    """Как RecipeViewSet.list."""
+    author = request.GET.get('author')
+    if author and not author.isdigit():
+        return None
+
+    async def render(drf_request):
+        user = drf_request.user
+        queryset = with_flags(RecipeViewSet.queryset.all(), drf_request)
+        # Фильтры в порядке RecipeFilter.Meta.fields.
+        for name, kind in RECIPE_FILTERS.items():
+            value = drf_request.query_params.get(name)
+            if not value:
+                continue
+            if kind is None:
+                if not await User.objects.filter(pk=value).aexists():
+                    return None
+                queryset = queryset.filter(author=value)
+            elif value.lower() in ('1', 'true') and user.is_authenticated:
+                queryset = filter_related(
+                    queryset, user, drf_request._relations, kind
+                )
+        pagination = CustomPageNumberPagination()
+        page_size = pagination.get_page_size(drf_request)
+        paginator = pagination.django_paginator_class(
+            rows_values(queryset), page_size
+        )
+        await paginator.acount()
+        try:
+            number = paginator.validate_number(
+                pagination.get_page_number(drf_request, paginator)
+            )
+        except InvalidPage:
+            return None
+        bottom = (number - 1) * page_size
+        rows = [
+            row async for row in
+            paginator.object_list[bottom:bottom + page_size]
+        ]
+        pagination.page = Page(rows, number, paginator)
+        pagination.request = drf_request
+        serializer = RecipeReadSerializer(context={'request': drf_request})
+        results = serializer.represent_cards(
+            rows, await aget_recipe_cards(rows)
+        )
+        return pagination.get_paginated_response(results).data
+
+    return await conditional_recipes(request, render)
+
+
+async def recipe_detail(request, pk):
+    """Как RecipeViewSet.retrieve."""
+    # Фильтры списка действуют и на карточку: их обрабатывает DRF.
+    if RECIPE_FILTERS.keys() & request.GET.keys():
+        return None
+
+    async def render(drf_request):
+        row = await rows_values(
+            with_flags(Recipe.objects.filter(pk=pk), drf_request)
+        ).afirst()
+        if row is None:
+            return None
+        serializer = RecipeReadSerializer(context={'request': drf_request})
+        return serializer.represent_cards(
+            [row], await aget_recipe_cards([row])
+        )[0]
+
+    return await conditional_recipes(request, render)
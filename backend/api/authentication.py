@@ -0,0 +1,184 @@
+"""Аутентификация без запроса к базе на каждый запрос.
+
+AUTH_MODE=token: токен djoser, пара «токен — пользователь» кэшируется на
+AUTH_CACHE_TIMEOUT. AUTH_MODE=jwt: короткоживущие JWT проверяются по
+подписи, пользователь загружается (из того же кэша) только если view
+нужны его поля, а не только id.
+
+Кэш сбрасывается при выходе (удаление токена), сохранении пользователя
+(в том числе смене пароля), его удалении и изменении его счётчиков
+(recipes.counters меняет их через update(), минуя post_save).
+"""
+from hashlib import sha256
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.functional import SimpleLazyObject
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from recipes.counters import COUNTERS, counters_of
+from utils.constants import AUTH_CACHE_TIMEOUT
+
+User = get_user_model()
+
+
+def token_key(key):
+    # Сам токен в ключ кэша не попадает.
+    return 'auth:token:' + sha256(key.encode()).hexdigest()
+
+
+def user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def check_active(user):
+    if user is None or not user.is_active:
+        raise AuthenticationFailed('Пользователь не найден или неактивен.')
+    return user
+
+
+def get_user(user_id):
+    """Активный пользователь по id из кэша или базы."""
+    user = cache.get(user_key(user_id))
+    if user is None:
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            cache.set(user_key(user_id), user, AUTH_CACHE_TIMEOUT)
+    return check_active(user)
+
+
+async def aget_user(user_id):
+    user = await cache.aget(user_key(user_id))
+    if user is None:
+        user = await User.objects.filter(pk=user_id).afirst()
+        if user is not None:
+            await cache.aset(user_key(user_id), user, AUTH_CACHE_TIMEOUT)
+    return check_active(user)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Токен djoser с кэшем «токен — пользователь»."""
+
+    def authenticate_credentials(self, key):
+        user_id = cache.get(token_key(key))
+        if user_id is not None:
+            return get_user(user_id), key
+        user, token = super().authenticate_credentials(key)
+        cache.set(token_key(key), user.pk, AUTH_CACHE_TIMEOUT)
+        cache.set(user_key(user.pk), user, AUTH_CACHE_TIMEOUT)
+        return user, token
+
+
+class LazyUser(SimpleLazyObject):
+    """Пользователь из JWT: id известен сразу, остальное — по обращению."""
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id):
+        super().__init__(lambda: get_user(user_id))
+        self.__dict__['_user_id'] = user_id
+
+    @property
+    def pk(self):
+        return self.__dict__['_user_id']
+
+    id = pk
+
+    def __bool__(self):
+        return True
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """JWT, проверяемый без обращения к базе."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise AuthenticationFailed('В токене нет идентификатора.')
+        return LazyUser(user_id)
+
+
+async def aauthenticate(request):
+    """Пользователь по заголовку Authorization для асинхронных view.
+
+    Те же правила, что у классов выше: None — учётных данных нет,
+    AuthenticationFailed — они неверны.
+    """
+    auth = request.headers.get('Authorization', '').split()
+    if not auth:
+        return None
+    keyword = auth[0]
+    if len(auth) != 2:
+        raise AuthenticationFailed('Недопустимый заголовок Authorization.')
+    if keyword.lower() == CachedTokenAuthentication.keyword.lower():
+        key = auth[1]
+        user_id = await cache.aget(token_key(key))
+        if user_id is not None:
+            return await aget_user(user_id)
+        token = await Token.objects.select_related('user').filter(
+            key=key
+        ).afirst()
+        if token is None:
+            raise AuthenticationFailed('Недопустимый токен.')
+        user = check_active(token.user)
+        await cache.aset_many(
+            {token_key(key): user.pk, user_key(user.pk): user},
+            AUTH_CACHE_TIMEOUT,
+        )
+        return user
+    if (
+        settings.AUTH_MODE == 'jwt'
+        and keyword in api_settings.AUTH_HEADER_TYPES
+    ):
+        authentication = StatelessJWTAuthentication()
+        return authentication.get_user(
+            authentication.get_validated_token(auth[1].encode())
+        )
+    return None
+
+
+def _invalidate(user_id):
+    key = user_key(user_id)
+    cache.delete(key)
+    # И после коммита: параллельный запрос мог успеть закэшировать
+    # старую строку.
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def _user_changed(sender, instance, update_fields=None, **kwargs):
+    # Вход по токену обновляет только last_login — в кэше это не нужно.
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    _invalidate(instance.pk)
+
+
+def _counted_link_changed(sender, instance, created=True, **kwargs):
+    # post_delete не передаёт created: удаление связи всегда меняет счётчик.
+    if not created:
+        return
+    for model, _, field in counters_of(sender):
+        if model is User:
+            _invalidate(getattr(instance, f'{field}_id'))
+
+
+def _token_deleted(sender, instance, **kwargs):
+    cache.delete(token_key(instance.key))
+
+
+def connect_signals():
+    post_save.connect(_user_changed, sender=User)
+    post_delete.connect(_user_changed, sender=User)
+    post_delete.connect(_token_deleted, sender=Token)
+    for model, _, source, _ in COUNTERS:
+        if model is User:
+            post_save.connect(_counted_link_changed, sender=source)
+            post_delete.connect(_counted_link_changed, sender=source)
@@ -0,0 +1,62 @@
+"""Кэш не зависящей от пользователя части рецепта (карточки).
+
+Карточка хранится в кэше готовым JSON под ключом с Recipe.updated_at,
+поэтому любое изменение рецепта, его ингредиентов или автора просто
+приводит к новому ключу, а старые записи истекают сами.
+"""
+import json
+
+from django.core.cache import cache
+
+from utils.constants import RECIPE_CARD_CACHE_TIMEOUT
+
+from .rows import arecipe_cards, recipe_cards
+
+
+def card_key(row):
+    return f'recipe_card:{row["id"]}:{row["updated_at"].timestamp()}'
+
+
+def _render(cards, missing):
+    return {
+        missing[recipe_id]: json.dumps(card, ensure_ascii=False)
+        for recipe_id, card in cards.items()
+    }
+
+
+def _parse(keys, cached):
+    return {
+        recipe_id: json.loads(cached[key])
+        for key, recipe_id in keys.items() if key in cached
+    }
+
+
+def _missing(keys, cached):
+    return {
+        recipe_id: key for key, recipe_id in keys.items()
+        if key not in cached
+    }
+
+
+def get_recipe_cards(rows):
+    """Карточки по строкам рецептов с полями id и updated_at."""
+    keys = {card_key(row): row['id'] for row in rows}
+    cached = cache.get_many(keys)
+    missing = _missing(keys, cached)
+    if missing:
+        rendered = _render(recipe_cards(list(missing)), missing)
+        cache.set_many(rendered, RECIPE_CARD_CACHE_TIMEOUT)
+        cached.update(rendered)
+    return _parse(keys, cached)
+
+
+async def aget_recipe_cards(rows):
+    """Асинхронный вариант get_recipe_cards."""
+    keys = {card_key(row): row['id'] for row in rows}
+    cached = await cache.aget_many(keys)
+    missing = _missing(keys, cached)
+    if missing:
+        rendered = _render(await arecipe_cards(list(missing)), missing)
+        await cache.aset_many(rendered, RECIPE_CARD_CACHE_TIMEOUT)
+        cached.update(rendered)
+    return _parse(keys, cached)
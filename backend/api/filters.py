@@ -2,6 +2,8 @@ from django_filters import rest_framework as filters
 
 from recipes.models import Recipe
 
+from .relations import filter_related, get_relations
+
 
 class RecipeFilter(filters.FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
@@ -14,10 +16,16 @@ class RecipeFilter(filters.FilterSet):
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
-            return queryset.filter(in_cart__user=self.request.user)
+            return filter_related(
+                queryset, self.request.user, get_relations(self.request),
+                'shopping_cart'
+            )
         return queryset
 
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
-            return queryset.filter(fans__user=self.request.user)
+            return filter_related(
+                queryset, self.request.user, get_relations(self.request),
+                'favorites'
+            )
         return queryset
@@ -0,0 +1,178 @@
+"""Уменьшенные копии изображений рецептов и аватаров.
+
+После сохранения нового файла в Recipe.image или User.avatar фоновый
+пул потоков строит копии нескольких ширин в WebP и JPEG. Имена копий
+выводятся из имени оригинала, а готовность отмечается в кэше; пока
+отметки нет, вместо копий отдаётся оригинал. Копии отдаются только по
+запросу: поля image_variants и avatar_variants нужно назвать в
+?fields= или ?include=. Если отметка пропала из
+кэша, копии перепроверяются при следующем запросе. Готовность копий
+меняет отдельную версию, которая входит в ETag только таких запросов.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models.signals import post_save, pre_save
+from PIL import Image, ImageOps
+
+from recipes.models import Recipe
+from utils.constants import (
+    IMAGE_VARIANT_QUALITY,
+    IMAGE_VARIANT_WIDTHS,
+    IMAGE_VARIANT_WORKERS,
+)
+
+from .versions import bump_version
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+IMAGE_FIELDS = {Recipe: 'image', User: 'avatar'}
+# Поля выдачи с копиями и версия, которая меняется, когда копии готовы.
+VARIANT_FIELDS = {'image_variants', 'avatar_variants'}
+VARIANTS_VERSION_KEY = 'version:image-variants'
+# Формат ответа, расширение файла и формат Pillow.
+FORMATS = (('webp', 'webp', 'WEBP'), ('jpeg', 'jpg', 'JPEG'))
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def variants_key(name):
+    return f'image_variants:{name}'
+
+
+def variant_name(name, width, extension):
+    path = PurePosixPath(name)
+    return f'variants/{width}/{path.parent / path.stem}.{extension}'
+
+
+def variant_names(name):
+    return [
+        variant_name(name, width, extension)
+        for width in IMAGE_VARIANT_WIDTHS
+        for _, extension, _ in FORMATS
+    ]
+
+
+def _encode(image, pillow_format):
+    has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+    if pillow_format == 'JPEG' and has_alpha:
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image.convert('RGBA'), mask=image.convert('RGBA'))
+        image = background
+    else:
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    buffer = BytesIO()
+    image.save(buffer, pillow_format, quality=IMAGE_VARIANT_QUALITY)
+    return ContentFile(buffer.getvalue())
+
+
+def build_variants(name, force=False):
+    """Строит копии оригинала name; без force — только недостающие."""
+    if force or not all(map(default_storage.exists, variant_names(name))):
+        with default_storage.open(name) as file:
+            original = ImageOps.exif_transpose(Image.open(file))
+            original.load()
+        for width in IMAGE_VARIANT_WIDTHS:
+            image = original.copy()
+            image.thumbnail((width, original.height))
+            for _, extension, pillow_format in FORMATS:
+                target = variant_name(name, width, extension)
+                # Имя копии должно совпадать с вычисленным, поэтому
+                # старую копию с тем же именем сначала удаляем.
+                default_storage.delete(target)
+                default_storage.save(target, _encode(image, pillow_format))
+    cache.set(variants_key(name), True, None)
+    # Меняется только выдача, где копии запрошены (см. variants_requested).
+    bump_version(VARIANTS_VERSION_KEY)
+
+
+def _build(name, force):
+    try:
+        build_variants(name, force)
+    except Exception:
+        logger.exception('Не удалось построить копии изображения %s', name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+        # Соединение потока пула иначе остаётся открытым навсегда: для
+        # фоновых потоков Django не закрывает соединения сам.
+        connection.close()
+
+
+def schedule_variants(name, force=False):
+    """Ставит построение копий в фоновый пул, если оно ещё не в нём."""
+    global _executor
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=IMAGE_VARIANT_WORKERS,
+                thread_name_prefix='image-variants',
+            )
+    _executor.submit(_build, name, force)
+
+
+def variants_requested(request):
+    """Названы ли поля с копиями в ?fields= или ?include=."""
+    named = {
+        field
+        for param in ('fields', 'include')
+        for field in request.query_params.get(param, '').split(',')
+    }
+    return bool(named & VARIANT_FIELDS)
+
+
+def image_variants(names):
+    """URL копий по именам оригиналов; пока копий нет — URL оригинала."""
+    names = {name for name in names if name}
+    ready = cache.get_many([variants_key(name) for name in names])
+    variants = {}
+    for name in names:
+        is_ready = variants_key(name) in ready
+        if not is_ready:
+            schedule_variants(name)
+        variants[name] = {
+            str(width): {
+                label: default_storage.url(
+                    variant_name(name, width, extension)
+                    if is_ready else name
+                )
+                for label, extension, _ in FORMATS
+            }
+            for width in IMAGE_VARIANT_WIDTHS
+        }
+    return variants
+
+
+def _mark_new_file(sender, instance, **kwargs):
+    # Незакоммиченный FieldFile — новый файл, который сохранится сейчас.
+    file = getattr(instance, IMAGE_FIELDS[sender])
+    instance._new_image = bool(file) and not file._committed
+
+
+def _on_save(sender, instance, **kwargs):
+    if not getattr(instance, '_new_image', False):
+        return
+    instance._new_image = False
+    name = getattr(instance, IMAGE_FIELDS[sender]).name
+    cache.delete(variants_key(name))
+    transaction.on_commit(lambda: schedule_variants(name, force=True))
+
+
+def connect_signals():
+    for model in IMAGE_FIELDS:
+        pre_save.connect(_mark_new_file, sender=model)
+        post_save.connect(_on_save, sender=model)
@@ -0,0 +1,80 @@
+from hashlib import md5
+
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import quote_etag
+
+from utils.constants import ANONYMOUS_CACHE_MAX_AGE
+
+from .images import VARIANTS_VERSION_KEY, variants_requested
+from .relations import relation_version_key
+from .versions import get_versions, model_version_key
+
+
+def make_etag(request, media_type, user, versions):
+    raw = '|'.join([
+        request.build_absolute_uri(),
+        media_type,
+        str(user.pk),
+        *versions,
+    ])
+    return quote_etag(md5(raw.encode(), usedforsecurity=False).hexdigest())
+
+
+def patch_conditional_headers(response, etag, user):
+    response['ETag'] = etag
+    if user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response, public=True, max_age=ANONYMOUS_CACHE_MAX_AGE
+        )
+    patch_vary_headers(response, ('Authorization',))
+
+
+class ConditionalGetMixin:
+    """ETag и ответ 304 для list/retrieve без сериализации данных.
+
+    versioned_models — модели, от которых зависит выдача;
+    user_relations — виды связей из api.relations, влияющие на флаги
+    текущего пользователя.
+    """
+
+    versioned_models = ()
+    user_relations = ()
+
+    def get_etag(self, request):
+        user = request.user
+        keys = [model_version_key(model) for model in self.versioned_models]
+        if user.is_authenticated:
+            keys += [
+                relation_version_key(kind, user.pk)
+                for kind in self.user_relations
+            ]
+        if variants_requested(request):
+            keys.append(VARIANTS_VERSION_KEY)
+        return make_etag(
+            request, request.accepted_media_type, user, get_versions(keys)
+        )
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            patch_conditional_headers(response, etag, request.user)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
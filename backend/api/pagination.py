@@ -1,10 +1,98 @@
-from rest_framework.pagination import PageNumberPagination
+from hashlib import md5
 
-from utils.constants import PAGE_SIZE
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from utils.constants import (
+    PAGE_SIZE,
+    PAGINATION_COUNT_CACHE_THRESHOLD,
+    PAGINATION_COUNT_CACHE_TIMEOUT,
+)
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор, кэширующий COUNT(*) для больших выборок.
+
+    Небольшие выборки (например, избранное пользователя) считаются
+    каждый раз, чтобы счётчик не отставал от действий пользователя.
+    """
+
+    def count_key(self):
+        """Ключ кэша счётчика; None — выборка заведомо пуста."""
+        try:
+            sql = str(self.object_list.query)
+        except EmptyResultSet:
+            return None
+        return 'paginator_count:' + md5(
+            sql.encode(), usedforsecurity=False
+        ).hexdigest()
+
+    @cached_property
+    def count(self):
+        key = self.count_key()
+        if key is None:
+            return 0
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            if count >= PAGINATION_COUNT_CACHE_THRESHOLD:
+                cache.set(key, count, PAGINATION_COUNT_CACHE_TIMEOUT)
+        return count
+
+    async def acount(self):
+        """count для асинхронных view: после вызова доступен и count."""
+        key = self.count_key()
+        count = 0
+        if key is not None:
+            count = await cache.aget(key)
+            if count is None:
+                count = await self.object_list.acount()
+                if count >= PAGINATION_COUNT_CACHE_THRESHOLD:
+                    await cache.aset(
+                        key, count, PAGINATION_COUNT_CACHE_TIMEOUT
+                    )
+        self.__dict__['count'] = count
+        return count
+
+
+class KeysetPagination(CursorPagination):
+    """Пагинация по ключу без COUNT(*) и OFFSET.
+
+    Порядок берётся из выборки или из Meta.ordering модели и должен
+    опираться на индексированное уникальное поле.
+    """
+
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        return tuple(ordering)
 
 
 class CustomPageNumberPagination(PageNumberPagination):
+    """Постраничная пагинация с опциональным режимом ?cursor=."""
+
+    django_paginator_class = CachedCountPaginator
     page_size_query_param = 'limit'
     page_size = PAGE_SIZE
     max_page_size = 100
     page_query_param = 'page'
+    cursor_query_param = 'cursor'
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,182 @@
+"""Кэш связей пользователя: избранное, список покупок и подписки.
+
+Множества id хранятся под ключом с версией связей владельца (той же,
+что входит в ETag). Версия меняется после коммита любой записи или
+удаления связи — из API, админки, ORM или каскадом, — поэтому
+устаревшее множество больше не читается, а ключ не нужно править.
+"""
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import post_delete, post_save
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+from utils.constants import RELATIONS_CACHE_MAX_SIZE, RELATIONS_CACHE_TIMEOUT
+
+from .versions import aget_versions, bump_version, get_versions
+
+# Вид связи: (модель, поле владельца, поле с id связанного объекта).
+RELATIONS = {
+    'favorites': (Favorite, 'user_id', 'recipe_id'),
+    'shopping_cart': (ShoppingCart, 'user_id', 'recipe_id'),
+    'subscriptions': (Subscription, 'subscriber_id', 'author_id'),
+}
+# Аннотация флага рецепта: (поле выдачи, вид связи, поле рецепта).
+FLAGS = {
+    'author_is_subscribed': ('author', 'subscriptions', 'author'),
+    'is_favorited': ('is_favorited', 'favorites', 'pk'),
+    'is_in_shopping_cart': (
+        'is_in_shopping_cart', 'shopping_cart', 'pk'
+    ),
+}
+# Метка в кэше для пользователей, чьи связи не помещаются в лимит.
+OVERFLOW = 'overflow'
+
+
+def relation_version_key(kind, user_id):
+    return f'version:{kind}:{user_id}'
+
+
+def _cache_key(user_id, kind, version):
+    return f'relations:{user_id}:{kind}:{version}'
+
+
+def _related_ids(user_id, kind):
+    model, owner_field, target_field = RELATIONS[kind]
+    return model.objects.filter(
+        **{owner_field: user_id}
+    ).values_list(
+        target_field, flat=True
+    )[:RELATIONS_CACHE_MAX_SIZE + 1]
+
+
+def _limited(ids):
+    if len(ids) > RELATIONS_CACHE_MAX_SIZE:
+        return OVERFLOW
+    return frozenset(ids)
+
+
+def _load(user_id, kind):
+    return _limited(list(_related_ids(user_id, kind)))
+
+
+async def _aload(user_id, kind):
+    return _limited([pk async for pk in _related_ids(user_id, kind)])
+
+
+class UserRelations:
+    """Множества id рецептов и авторов, связанных с пользователем.
+
+    Значение None в ids означает, что связей больше лимита кэша:
+    такие проверки выполняются запросом к базе.
+    """
+
+    def __init__(self, user, ids):
+        self.user = user
+        self.ids = ids
+
+    @staticmethod
+    def cache_keys(user, versions):
+        return {
+            _cache_key(user.pk, kind, version): kind
+            for kind, version in zip(RELATIONS, versions)
+        }
+
+    @staticmethod
+    def version_keys(user):
+        # Версия читается до загрузки из базы: если связь изменится
+        # между загрузкой и записью в кэш, версия уже будет другой.
+        return [relation_version_key(kind, user.pk) for kind in RELATIONS]
+
+    @classmethod
+    def load(cls, user):
+        keys = cls.cache_keys(user, get_versions(cls.version_keys(user)))
+        cached = cache.get_many(keys)
+        missing = {
+            key: _load(user.pk, kind)
+            for key, kind in keys.items() if key not in cached
+        }
+        if missing:
+            cache.set_many(missing, RELATIONS_CACHE_TIMEOUT)
+        return cls.from_cache(user, keys, {**cached, **missing})
+
+    @classmethod
+    async def aload(cls, user, versions=None):
+        """versions — уже прочитанные версии по ключам, например для ETag."""
+        version_keys = cls.version_keys(user)
+        if versions is None:
+            values = await aget_versions(version_keys)
+        else:
+            values = [versions[key] for key in version_keys]
+        keys = cls.cache_keys(user, values)
+        cached = await cache.aget_many(keys)
+        missing = {
+            key: await _aload(user.pk, kind)
+            for key, kind in keys.items() if key not in cached
+        }
+        if missing:
+            await cache.aset_many(missing, RELATIONS_CACHE_TIMEOUT)
+        return cls.from_cache(user, keys, {**cached, **missing})
+
+    @classmethod
+    def from_cache(cls, user, keys, values):
+        return cls(user, {
+            kind: None if values[key] == OVERFLOW else values[key]
+            for key, kind in keys.items()
+        })
+
+    def has(self, kind, pk):
+        ids = self.ids[kind]
+        if ids is not None:
+            return pk in ids
+        model, owner_field, target_field = RELATIONS[kind]
+        return model.objects.filter(
+            **{owner_field: self.user.pk, target_field: pk}
+        ).exists()
+
+
+def get_relations(request):
+    """Связи текущего пользователя, загружаемые один раз за запрос."""
+    if not hasattr(request, '_relations'):
+        request._relations = UserRelations.load(request.user)
+    return request._relations
+
+
+def filter_related(queryset, user, relations, kind):
+    """Рецепты, связанные с пользователем связью kind."""
+    ids = relations.ids[kind]
+    if ids is not None:
+        return queryset.filter(pk__in=ids)
+    model, owner_field, target_field = RELATIONS[kind]
+    return queryset.filter(Exists(model.objects.filter(
+        **{owner_field: user.pk, target_field: OuterRef('pk')}
+    )))
+
+
+def annotate_flags(queryset, user, relations, fields):
+    """Флаги рецептов подзапросами для запрошенных полей fields — только
+    по связям, которые не поместились в кэш."""
+    for annotation, (field, kind, outer_field) in FLAGS.items():
+        if field in fields and relations.ids[kind] is None:
+            model, owner_field, target_field = RELATIONS[kind]
+            queryset = queryset.annotate(**{annotation: Exists(
+                model.objects.filter(**{
+                    owner_field: user.pk,
+                    target_field: OuterRef(outer_field),
+                })
+            )})
+    return queryset
+
+
+def _on_change(sender, instance, **kwargs):
+    for kind, (model, owner_field, _) in RELATIONS.items():
+        if sender is model:
+            bump_version(
+                relation_version_key(kind, getattr(instance, owner_field))
+            )
+
+
+def connect_signals():
+    for model, _, _ in RELATIONS.values():
+        post_save.connect(_on_change, sender=model)
+        post_delete.connect(_on_change, sender=model)
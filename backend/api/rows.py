@@ -0,0 +1,122 @@
+"""Сборка выдачи API из строк values() без моделей и сериализаторов.
+
+Формат совпадает с UserSerializer, RecipeIngredientSerializer и
+RecipeMiniSerializer, но на каждый объект не создаются ни экземпляры
+моделей, ни вложенные сериализаторы.
+"""
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from recipes.models import Recipe, RecipeIngredient
+
+from .images import image_variants
+
+User = get_user_model()
+
+USER_FIELDS = ['email', 'id', 'avatar', 'username', 'first_name', 'last_name']
+MINI_RECIPE_FIELDS = ['id', 'name', 'image', 'cooking_time']
+
+
+def file_url(model, field_name, name):
+    """URL файла по его имени в хранилище поля, как у FieldFile.url."""
+    if not name:
+        return None
+    return model._meta.get_field(field_name).storage.url(name)
+
+
+def user_from_row(row, prefix=''):
+    user = {field: row[prefix + field] for field in USER_FIELDS}
+    user['avatar'] = file_url(User, 'avatar', user['avatar'])
+    return user
+
+
+def mini_recipe_from_row(row):
+    recipe = {field: row[field] for field in MINI_RECIPE_FIELDS}
+    recipe['image'] = file_url(Recipe, 'image', recipe['image'])
+    return recipe
+
+
+def _card_queries(ids):
+    components = RecipeIngredient.objects.filter(
+        recipe_id__in=ids
+    ).order_by('id').values_list(
+        'recipe_id',
+        'ingredient_id',
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'amount',
+    )
+    recipes = Recipe.objects.filter(pk__in=ids).values(
+        'id', 'name', 'image', 'text', 'cooking_time',
+        *[f'author__{field}' for field in USER_FIELDS],
+    )
+    return components, recipes
+
+
+def _cards(components, recipes):
+    ingredients = defaultdict(list)
+    for recipe_id, *values in components:
+        ingredients[recipe_id].append(dict(zip(
+            ('id', 'name', 'measurement_unit', 'amount'), values
+        )))
+    return {
+        row['id']: {
+            'id': row['id'],
+            'author': user_from_row(row, 'author__'),
+            'ingredients': ingredients[row['id']],
+            'name': row['name'],
+            'image': file_url(Recipe, 'image', row['image']),
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        }
+        for row in recipes
+    }
+
+
+def recipe_cards(ids):
+    """Карточки рецептов по id: два запроса на любое число рецептов."""
+    return _cards(*_card_queries(ids))
+
+
+async def arecipe_cards(ids):
+    """Асинхронный вариант recipe_cards."""
+    components, recipes = _card_queries(ids)
+    return _cards(
+        [values async for values in components],
+        [row async for row in recipes],
+    )
+
+
+def recipes_by_author(author_ids, limit=None, variants=False):
+    """Краткие рецепты авторов одним запросом, не больше limit на автора.
+
+    Рецепты идут от новых к старым; лимит применяется в базе оконной
+    функцией ROW_NUMBER() по автору, так что лишние строки не читаются.
+    С variants у рецептов есть и image_variants (см. api.images).
+    """
+    recipes = defaultdict(list)
+    queryset = Recipe.objects.filter(author_id__in=author_ids)
+    if limit is not None:
+        queryset = queryset.alias(
+            position=Window(
+                RowNumber(),
+                partition_by=F('author_id'),
+                order_by=F('id').desc(),
+            )
+        ).filter(position__lte=limit)
+    rows = queryset.order_by('author_id', '-id').values(
+        'author_id', *MINI_RECIPE_FIELDS
+    )
+    images = []
+    for row in rows:
+        recipe = mini_recipe_from_row(row)
+        recipes[row['author_id']].append(recipe)
+        images.append((recipe, row['image']))
+    if variants:
+        urls = image_variants(name for _, name in images)
+        for recipe, name in images:
+            recipe['image_variants'] = urls.get(name)
+    return recipes
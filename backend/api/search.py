@@ -0,0 +1,127 @@
+"""Поиск ингредиентов по индексу в памяти воркера.
+
+Справочник ингредиентов небольшой и меняется редко, поэтому каждый
+воркер держит его отсортированным по «свёрнутому» названию и отвечает
+на автодополнение без обращения к базе. Для поиска с опечатками рядом
+хранится триграммный индекс, устроенный как в pg_trgm. Индекс
+перестраивается, когда меняется версия модели Ingredient
+(см. api.versions).
+"""
+import asyncio
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from recipes.models import Ingredient
+from utils.constants import FUZZY_SEARCH_THRESHOLD
+
+from .versions import aget_versions, get_versions, model_version_key
+
+
+def fold(text):
+    """Название без учёта регистра и различия «е» и «ё»."""
+    return text.casefold().replace('ё', 'е')
+
+
+def trigrams(text):
+    """Триграммы слов, дополненных пробелами, как в pg_trgm."""
+    return {
+        padded[i:i + 3]
+        for word in re.findall(r'\w+', fold(text))
+        for padded in [f'  {word} ']
+        for i in range(len(padded) - 2)
+    }
+
+
+class IngredientIndex:
+    """Ингредиенты, отсортированные по свёрнутому названию."""
+
+    def __init__(self, ingredients):
+        entries = sorted(
+            (fold(name), pk, name, measurement_unit)
+            for pk, name, measurement_unit in ingredients
+        )
+        self.keys = [key for key, *_ in entries]
+        self.items = [
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for _, pk, name, measurement_unit in entries
+        ]
+        self.trigrams = [trigrams(key) for key in self.keys]
+        self.postings = defaultdict(list)
+        for position, item_trigrams in enumerate(self.trigrams):
+            for trigram in item_trigrams:
+                self.postings[trigram].append(position)
+
+    def startswith(self, prefix, limit=None):
+        prefix = fold(prefix)
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\U0010ffff', lo=start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return self.items[start:end]
+
+    def fuzzy(self, query, limit=None):
+        """Поиск с опечатками.
+
+        Сначала идут названия, начинающиеся с запроса, затем остальные
+        по доле найденных триграмм запроса и по сходству названий.
+        """
+        query_trigrams = trigrams(query)
+        if not query_trigrams:
+            return []
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self.postings.get(trigram, ()))
+        prefix = fold(query)
+        ranked = []
+        for position, count in shared.items():
+            if self.keys[position].startswith(prefix):
+                ranked.append((0, position))
+                continue
+            score = count / len(query_trigrams)
+            if score >= FUZZY_SEARCH_THRESHOLD:
+                similarity = count / (
+                    len(query_trigrams) + len(self.trigrams[position]) - count
+                )
+                ranked.append((1, -score, -similarity, position))
+        ranked.sort()
+        return [self.items[position] for *_, position in ranked[:limit]]
+
+
+_index = None
+_index_version = None
+_index_lock = None
+
+
+def get_ingredient_index():
+    """Индекс текущего воркера, перестроенный при смене версии."""
+    global _index, _index_version
+    version, = get_versions([model_version_key(Ingredient)])
+    if _index is None or version != _index_version:
+        _index = IngredientIndex(
+            Ingredient.objects.values_list('id', 'name', 'measurement_unit')
+        )
+        _index_version = version
+    return _index
+
+
+async def aget_ingredient_index():
+    """То же для асинхронных view (см. api.async_views).
+
+    Индекс строит один запрос, остальные ждут его, а не строят свой.
+    """
+    global _index, _index_version, _index_lock
+    version, = await aget_versions([model_version_key(Ingredient)])
+    if _index is not None and version == _index_version:
+        return _index
+    if _index_lock is None:
+        _index_lock = asyncio.Lock()
+    async with _index_lock:
+        if _index is None or version != _index_version:
+            _index = IngredientIndex([
+                row async for row in Ingredient.objects.values_list(
+                    'id', 'name', 'measurement_unit'
+                )
+            ])
+            _index_version = version
+    return _index
@@ -1,6 +1,7 @@
 import base64
 
 from django.core.files.base import ContentFile
+from django.db import models, transaction
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 
@@ -8,6 +9,7 @@ from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
 from users.models import Subscription
+from recipes.shopping import refresh_recipe_totals
 from recipes.models import (
     Ingredient,
     Recipe,
@@ -22,11 +24,31 @@ from utils.constants import (
     MAX_INGREDIENT_AMOUNT
 )
 
+from .cards import get_recipe_cards
+from .images import image_variants
+from .relations import get_relations
+from .rows import (
+    MINI_RECIPE_FIELDS,
+    USER_FIELDS,
+    mini_recipe_from_row,
+    recipes_by_author,
+    user_from_row,
+)
+from .uploads import open_upload
+
 User = get_user_model()
 
 
 class Base64ImageField(serializers.ImageField):
-    """Поле для загрузки изображения в формате base64."""
+    """Поле для загрузки изображения в формате base64.
+
+    Вместо base64-строки принимает и ссылку на файл, загруженный
+    через /api/uploads/ (см. api.uploads).
+    """
+
+    default_error_messages = {
+        'invalid_upload': 'Загрузка не найдена или устарела.',
+    }
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
@@ -35,10 +57,72 @@ class Base64ImageField(serializers.ImageField):
             image_data = base64.b64decode(image_str)
             file_name = f'temp.{ext}'
             data = ContentFile(image_data, name=file_name)
+        elif isinstance(data, str):
+            data = open_upload(data, self.context['request'].user)
+            if data is None:
+                self.fail('invalid_upload')
 
         return super().to_internal_value(data)
 
 
+def requested_fields(request, fields, optional=()):
+    """Поля из fields, оставленные параметрами ?fields= и ?omit=.
+
+    Поля из optional отдаются, только если названы в ?fields= или
+    ?include=.
+    """
+    only = request.query_params.get('fields')
+    include = set(request.query_params.get('include', '').split(','))
+    if only:
+        only = set(only.split(','))
+        fields = [field for field in fields if field in only]
+    fields = [
+        field for field in fields
+        if field not in optional or field in include or only
+    ]
+    omit = request.query_params.get('omit')
+    if omit:
+        omit = set(omit.split(','))
+        fields = [field for field in fields if field not in omit]
+    return fields
+
+
+def absolute_variants(request, variants):
+    """Абсолютные URL в словаре из api.images.image_variants."""
+    return {
+        width: {
+            label: request.build_absolute_uri(url)
+            for label, url in formats.items()
+        }
+        for width, formats in variants.items()
+    }
+
+
+class SparseFieldsMixin:
+    """Выборочные поля (?fields= / ?omit=) у корневого сериализатора.
+
+    optional_fields — поля, которых нет в выдаче по умолчанию.
+    """
+
+    optional_fields = ()
+
+    @property
+    def selected_fields(self):
+        request = self.context.get('request')
+        if request is None or self.root not in (self, self.parent):
+            return [
+                field for field in self.Meta.fields
+                if field not in self.optional_fields
+            ]
+        return requested_fields(
+            request, self.Meta.fields, self.optional_fields
+        )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        return {name: fields[name] for name in self.selected_fields}
+
+
 class AvatarSerializer(serializers.ModelSerializer):
     avatar = Base64ImageField()
 
@@ -47,27 +131,39 @@ class AvatarSerializer(serializers.ModelSerializer):
         fields = ['avatar']
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     avatar = serializers.ImageField(required=False)
+    avatar_variants = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
 
+    optional_fields = ('avatar_variants',)
+
     class Meta:
         model = User
         fields = [
             'email',
             'id',
             'avatar',
+            'avatar_variants',
             'username',
             'first_name',
             'last_name',
             'is_subscribed',
         ]
 
+    def get_avatar_variants(self, obj):
+        if not obj.avatar:
+            return None
+        variants = image_variants([obj.avatar.name])[obj.avatar.name]
+        return absolute_variants(self.context['request'], variants)
+
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if not user.is_authenticated:
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        request = self.context.get('request')
+        if not request.user.is_authenticated:
             return False
-        return obj.subscribers.filter(subscriber=user).exists()
+        return get_relations(request).has('subscriptions', obj.id)
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -89,45 +185,147 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
 
 
 class RecipeMiniSerializer(serializers.ModelSerializer):
+    """Краткий рецепт; image_variants — только по ?include=image_variants,
+    как у рецептов в подписках."""
+
     class Meta:
         model = Recipe
         fields = ['id', 'name', 'image', 'cooking_time']
         read_only_fields = fields
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        request = self.context.get('request')
+        if request is not None and 'image_variants' in (
+            request.query_params.get('include', '').split(',')
+        ):
+            name = instance.image.name
+            data['image_variants'] = absolute_variants(
+                request, image_variants([name]).get(name, {})
+            )
+        return data
+
+
+class RecipeReadListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        return self.child.represent_many(list(data))
+
+
+class RecipeReadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Рецепт на чтение: карточка из кэша плюс флаги пользователя."""
+
+    FLAG_ANNOTATIONS = (
+        'is_favorited', 'is_in_shopping_cart', 'author_is_subscribed'
+    )
+    # Поля, которые отдаются прямо из строки рецепта, без карточки.
+    ROW_FIELDS = {
+        *MINI_RECIPE_FIELDS,
+        'image_variants', 'is_favorited', 'is_in_shopping_cart',
+    }
 
-class RecipeReadSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     ingredients = RecipeIngredientSerializer(
         source='components', many=True, read_only=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_variants = serializers.DictField(read_only=True)
+
+    optional_fields = ('image_variants',)
 
     class Meta:
         model = Recipe
         fields = [
             'id', 'author', 'ingredients',
             'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time'
+            'name', 'image', 'image_variants', 'text', 'cooking_time'
         ]
+        list_serializer_class = RecipeReadListSerializer
 
-    def get_is_favorited(self, obj):
-        user = self.context['request'].user
+    def to_representation(self, instance):
+        row = {
+            'id': instance.pk,
+            'author_id': instance.author_id,
+            'updated_at': instance.updated_at,
+            'name': instance.name,
+            'image': instance.image.name,
+            'cooking_time': instance.cooking_time,
+        }
+        for annotation in self.FLAG_ANNOTATIONS:
+            if hasattr(instance, annotation):
+                row[annotation] = getattr(instance, annotation)
+        return self.represent_many([row])[0]
+
+    def represent_many(self, rows):
+        """Рецепты по строкам values() с аннотациями флагов.
+
+        Если запрошены только поля из ROW_FIELDS, строки содержат
+        MINI_RECIPE_FIELDS и карточки не нужны; иначе в строках есть
+        id, author_id и updated_at для ключа карточки.
+        """
+        fields = self.selected_fields
+        if self.ROW_FIELDS.issuperset(fields):
+            cards = {row['id']: mini_recipe_from_row(row) for row in rows}
+        else:
+            cards = get_recipe_cards(rows)
+        return self.represent_cards(rows, cards)
+
+    def represent_cards(self, rows, cards):
+        """Рецепты по строкам и уже полученным карточкам."""
+        fields = self.selected_fields
+        if 'image_variants' in fields:
+            request = self.context['request']
+            variants = image_variants(row['image'] for row in rows)
+            for row in rows:
+                cards[row['id']]['image_variants'] = absolute_variants(
+                    request, variants.get(row['image'], {})
+                )
+        return [
+            self.merge_flags(row, cards[row['id']], fields) for row in rows
+        ]
+
+    def merge_flags(self, row, card, fields):
+        request = self.context['request']
+        if 'author' in fields:
+            author = card['author']
+            if author['avatar']:
+                author['avatar'] = request.build_absolute_uri(
+                    author['avatar']
+                )
+            author['is_subscribed'] = self.get_flag(
+                row, 'author_is_subscribed', 'subscriptions',
+                row['author_id']
+            )
+        if card['image']:
+            card['image'] = request.build_absolute_uri(card['image'])
+        if 'is_favorited' in fields:
+            card['is_favorited'] = self.get_is_favorited(row)
+        if 'is_in_shopping_cart' in fields:
+            card['is_in_shopping_cart'] = self.get_is_in_shopping_cart(row)
+        return {field: card[field] for field in fields}
+
+    def get_flag(self, row, annotation, kind, pk):
+        if annotation in row:
+            return row[annotation]
+        request = self.context['request']
         return (
-            user.is_authenticated
-            and obj.fans.filter(user=user).exists()
+            request.user.is_authenticated
+            and get_relations(request).has(kind, pk)
         )
 
-    def get_is_in_shopping_cart(self, obj):
-        user = self.context['request'].user
-        return (
-            user.is_authenticated
-            and obj.in_cart.filter(user=user).exists()
+    def get_is_favorited(self, row):
+        return self.get_flag(row, 'is_favorited', 'favorites', row['id'])
+
+    def get_is_in_shopping_cart(self, row):
+        return self.get_flag(
+            row, 'is_in_shopping_cart', 'shopping_cart', row['id']
         )
 
 
 class RecipeIngredientWriteSerializer(serializers.Serializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(
         min_value=MIN_INGREDIENT_AMOUNT,
         max_value=MAX_INGREDIENT_AMOUNT
@@ -168,6 +366,19 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Ингредиенты не должны повторяться')
 
+        # Все id проверяются одним запросом, а не по запросу на ингредиент.
+        missing = set(ingredient_ids) - set(
+            Ingredient.objects.filter(
+                pk__in=ingredient_ids
+            ).values_list('pk', flat=True)
+        )
+        if missing:
+            raise serializers.ValidationError({
+                'ingredients': 'Ингредиенты не найдены: {}'.format(
+                    ', '.join(map(str, sorted(missing)))
+                )
+            })
+
         return data
 
     def to_representation(self, instance):
@@ -182,46 +393,124 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             recipe_ingredients.append(
                 RecipeIngredient(
                     recipe=recipe,
-                    ingredient=ingredient_data['id'],
+                    ingredient_id=ingredient_data['id'],
                     amount=ingredient_data['amount']
                 )
             )
         RecipeIngredient.objects.bulk_create(recipe_ingredients)
 
+    def update_ingredients(self, recipe, ingredients):
+        """Применяет к рецепту только разницу в составе.
+
+        Новые ингредиенты добавляются, изменённые количества
+        обновляются, убранные удаляются — по запросу на каждое действие.
+        """
+        amounts = {item['id']: item['amount'] for item in ingredients}
+        current = {
+            component.ingredient_id: component
+            for component in recipe.components.all()
+        }
+        removed = current.keys() - amounts.keys()
+        if removed:
+            recipe.components.filter(ingredient_id__in=removed).delete()
+        changed = []
+        for ingredient_id, component in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and component.amount != amount:
+                component.amount = amount
+                changed.append(component)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        added = [item for item in ingredients if item['id'] not in current]
+        self.set_ingredients(recipe, added)
+        # bulk-операции не шлют сигналов: суммы списков покупок
+        # пересчитываем сами (удалённые строки обработают сигналы).
+        touched = [component.ingredient_id for component in changed]
+        touched += [item['id'] for item in added]
+        if touched:
+            refresh_recipe_totals(recipe.id, touched)
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
         self.set_ingredients(recipe, ingredients)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredients')
-        instance.ingredients.clear()
-        self.set_ingredients(instance, ingredients)
+        self.update_ingredients(instance, ingredients)
         return super().update(instance, validated_data)
 
 
+class SubscriptionListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        return self.child.represent_many(list(data))
+
+
 class SubscriptionSerializer(UserSerializer):
-    recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(read_only=True, default=0)
+    """Автор из подписок; список собирается из строк values()."""
+
+    recipes = serializers.ListField(read_only=True)
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + [
             'recipes',
             'recipes_count',
         ]
+        list_serializer_class = SubscriptionListSerializer
+
+    def to_representation(self, instance):
+        row = {field: getattr(instance, field) for field in USER_FIELDS}
+        row['avatar'] = instance.avatar.name
+        row['recipes_count'] = instance.recipes_count
+        return self.represent_many([row])[0]
+
+    def represent_many(self, rows):
+        """Авторы по строкам с полями USER_FIELDS и recipes_count."""
+        request = self.context['request']
+        fields = self.selected_fields
+        if 'recipes' in fields:
+            recipes = recipes_by_author(
+                [row['id'] for row in rows],
+                self.get_recipes_limit(),
+                variants='image_variants' in request.query_params.get(
+                    'include', ''
+                ).split(','),
+            )
+        if 'avatar_variants' in fields:
+            variants = image_variants(row['avatar'] for row in rows)
+        authors = []
+        for row in rows:
+            author = user_from_row(row)
+            if author['avatar']:
+                author['avatar'] = request.build_absolute_uri(
+                    author['avatar']
+                )
+            if 'avatar_variants' in fields:
+                author['avatar_variants'] = (
+                    absolute_variants(request, variants[row['avatar']])
+                    if row['avatar'] else None
+                )
+            author['is_subscribed'] = True
+            if 'recipes' in fields:
+                author['recipes'] = recipes[row['id']]
+            if 'recipes_count' in fields:
+                author['recipes_count'] = row['recipes_count']
+            authors.append({field: author[field] for field in fields})
+        return authors
+
+    def get_recipes_limit(self):
+        recipes_limit = self.context.get('recipes_limit')
+        if isinstance(recipes_limit, str) and recipes_limit.isdigit():
+            return int(recipes_limit)
+        return None
 
     def get_is_subscribed(self, obj):
         return True
 
-    def get_recipes(self, obj):
-        recipes = obj.recipes.all()
-        recipes_limit = self.context.get('recipes_limit')
-        if recipes_limit:
-            if isinstance(recipes_limit, str) and recipes_limit.isdigit():
-                recipes = recipes[:int(recipes_limit)]
-        return RecipeMiniSerializer(recipes, many=True).data
-
 
 class FavoriteSerializer(serializers.ModelSerializer):
     class Meta:
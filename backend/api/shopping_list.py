@@ -0,0 +1,90 @@
+"""Список покупок: сумма ингредиентов корзины и её построчная выдача.
+
+Суммы хранятся готовыми в ShoppingListItem (см. recipes.shopping) и
+читаются из базы курсором, а каждый формат — генератор строк ответа,
+поэтому список отдаётся потоком и память не растёт с размером корзины.
+"""
+import csv
+import json
+
+from recipes.models import ShoppingListItem
+
+FIELDS = ('id', 'name', 'measurement_unit', 'amount', 'recipe_count')
+
+
+def _items(user):
+    return ShoppingListItem.objects.filter(user=user).values_list(
+        'ingredient_id',
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'amount',
+        'recipe_count',
+    ).order_by(
+        'ingredient__name', 'ingredient__measurement_unit', 'ingredient_id'
+    )
+
+
+def shopping_list(user):
+    """Ингредиенты корзины по алфавиту, сгруппированные по id."""
+    for row in _items(user).iterator():
+        yield dict(zip(FIELDS, row))
+
+
+async def ashopping_list(user):
+    async for row in _items(user):
+        yield dict(zip(FIELDS, row))
+
+
+def txt_line(index, item):
+    return (
+        f"{item['name']} "
+        f"{item['measurement_unit']} — "
+        f"{item['amount']} "
+        f"(в {item['recipe_count']} рецептах)\n"
+    )
+
+
+class _Line:
+    """Буфер csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+_csv_writer = csv.writer(_Line())
+
+
+def csv_line(index, item):
+    return _csv_writer.writerow([item[field] for field in FIELDS])
+
+
+def json_line(index, item):
+    return (',' if index else '') + json.dumps(item, ensure_ascii=False)
+
+
+# Формат: (начало, строка для позиции, конец).
+EXPORTS = {
+    'txt': ('Список покупок:\n\n', txt_line, ''),
+    'csv': (_csv_writer.writerow(FIELDS), csv_line, ''),
+    'json': ('[', json_line, ']'),
+}
+
+
+def export(export_format, items):
+    head, line, tail = EXPORTS[export_format]
+    yield head
+    for index, item in enumerate(items):
+        yield line(index, item)
+    if tail:
+        yield tail
+
+
+async def aexport(export_format, items):
+    head, line, tail = EXPORTS[export_format]
+    yield head
+    index = 0
+    async for item in items:
+        yield line(index, item)
+        index += 1
+    if tail:
+        yield tail
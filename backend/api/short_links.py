@@ -0,0 +1,85 @@
+"""Короткие ссылки на рецепты: /s/<код>, где код — id в base62.
+
+Код вычисляется из id без обращения к базе. Каждый воркер помнит id
+рецептов, которые уже находил, и сбрасывает этот набор, когда меняется
+версия удалений рецептов (она хранится в общем кэше, см. api.versions),
+поэтому повторные переходы по ссылке не обращаются к базе.
+"""
+import string
+
+from django.db.models.signals import post_delete
+
+from recipes.models import Recipe
+from utils.constants import SHORT_LINK_KNOWN_IDS_MAX_SIZE
+
+from .versions import aget_versions, bump_version, get_versions
+
+ALPHABET = string.digits + string.ascii_letters
+DELETED_VERSION_KEY = 'version:recipes.recipe:deleted'
+
+_known_ids = set()
+_known_version = None
+
+
+def encode(number):
+    code = ''
+    while True:
+        number, digit = divmod(number, len(ALPHABET))
+        code = ALPHABET[digit] + code
+        if not number:
+            return code
+
+
+def decode(code):
+    """id по коду или None, если код не из алфавита base62."""
+    if not code or code[0] == '0' and len(code) > 1:
+        return None
+    number = 0
+    for char in code:
+        digit = ALPHABET.find(char)
+        if digit < 0:
+            return None
+        number = number * len(ALPHABET) + digit
+    return number
+
+
+def _sync_known_ids(version):
+    global _known_version
+    if version != _known_version:
+        _known_ids.clear()
+        _known_version = version
+
+
+def _remember(recipe_id):
+    if len(_known_ids) >= SHORT_LINK_KNOWN_IDS_MAX_SIZE:
+        _known_ids.clear()
+    _known_ids.add(recipe_id)
+
+
+def recipe_exists(recipe_id):
+    """Есть ли рецепт; известные воркеру id проверяются без базы."""
+    _sync_known_ids(*get_versions([DELETED_VERSION_KEY]))
+    if recipe_id in _known_ids:
+        return True
+    if not Recipe.objects.filter(pk=recipe_id).exists():
+        return False
+    _remember(recipe_id)
+    return True
+
+
+async def arecipe_exists(recipe_id):
+    _sync_known_ids(*await aget_versions([DELETED_VERSION_KEY]))
+    if recipe_id in _known_ids:
+        return True
+    if not await Recipe.objects.filter(pk=recipe_id).aexists():
+        return False
+    _remember(recipe_id)
+    return True
+
+
+def _recipe_deleted(sender, **kwargs):
+    bump_version(DELETED_VERSION_KEY)
+
+
+def connect_signals():
+    post_delete.connect(_recipe_deleted, sender=Recipe)
@@ -0,0 +1,694 @@
+import csv
+import json
+import tempfile
+from collections import Counter
+from io import BytesIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import Http404
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.authtoken.models import Token
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+)
+from users.models import Subscription
+
+from .async_views import (
+    download_shopping_cart,
+    ingredients,
+    recipe_detail,
+    recipe_list,
+    short_link,
+    with_fallback,
+)
+from .authentication import get_user
+from .short_links import encode
+from .urls import router_views
+
+User = get_user_model()
+
+
+class APIDataMixin:
+    """Авторы с рецептами и пользователь со связями с ними."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [
+            User.objects.create_user(
+                email=f'author{i}@example.com', username=f'author{i}',
+                first_name='Автор', last_name=str(i), password='pass12345!'
+            )
+            for i in range(5)
+        ]
+        cls.authors[0].avatar = 'users/avatars/avatar.png'
+        cls.authors[0].save()
+        cls.user = User.objects.create_user(
+            email='user@example.com', username='user',
+            first_name='Читатель', last_name='Рецептов',
+            password='pass12345!'
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {i}', measurement_unit='г')
+            for i in range(10)
+        )
+        cls.recipes = []
+        for i in range(40):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {i}', text='Описание', cooking_time=10 + i,
+                image='recipes/images/recipe.png',
+                author=cls.authors[i % len(cls.authors)],
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=i + 1
+                )
+                for ingredient in ingredients[i % 7:i % 7 + 3]
+            )
+            cls.recipes.append(recipe)
+        for recipe in cls.recipes[::3]:
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+        for recipe in cls.recipes[1::4]:
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        for author in cls.authors[:2]:
+            Subscription.objects.create(subscriber=cls.user, author=author)
+
+    def setUp(self):
+        # Кэш общий для всех тестов.
+        cache.clear()
+        self.client = APIClient()
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+
+class RecipeListQueriesTest(APIDataMixin, TestCase):
+    """Число запросов к базе на страницу списка не зависит от её размера."""
+
+    def assert_list_queries(self):
+        # Первые запросы заполняют кэши, если они есть.
+        for limit in (6, 30):
+            self.client.get(f'/api/recipes/?limit={limit}')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/recipes/?limit=6')
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get('/api/recipes/?limit=30')
+        results = response.json()['results']
+        self.assertEqual(len(results), 30)
+        self.assert_flags(results)
+
+    def assert_flags(self, results):
+        favorites = {recipe.id for recipe in self.recipes[::3]}
+        in_cart = {recipe.id for recipe in self.recipes[1::4]}
+        subscriptions = {author.id for author in self.authors[:2]}
+        for recipe in results:
+            self.assertEqual(recipe['is_favorited'], recipe['id'] in favorites)
+            self.assertEqual(
+                recipe['is_in_shopping_cart'], recipe['id'] in in_cart
+            )
+            self.assertEqual(
+                recipe['author']['is_subscribed'],
+                recipe['author']['id'] in subscriptions
+            )
+
+    def test_queries_do_not_depend_on_page_size(self):
+        self.assert_list_queries()
+
+    def test_relations_over_cache_limit(self):
+        # Связи не помещаются в кэш: флаги считаются запросами к базе.
+        with mock.patch('api.relations.RELATIONS_CACHE_MAX_SIZE', 1):
+            self.assert_list_queries()
+
+    def test_relations_follow_orm_changes(self):
+        recipe = self.recipes[0]
+        url = f'/api/recipes/{recipe.id}/'
+        self.assertTrue(self.client.get(url).json()['is_favorited'])
+        # Связь удаляется мимо API: кэш сбрасывается по сигналу.
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.filter(user=self.user, recipe=recipe).delete()
+        self.assertFalse(self.client.get(url).json()['is_favorited'])
+
+    def test_ingredients_in_one_query(self):
+        self.client.get('/api/recipes/?limit=10')
+        # 30 рецептов, для 20 из них карточек ещё нет в кэше: число
+        # записей, строки рецептов, их ингредиенты и карточки.
+        with CaptureQueriesContext(connection) as queries:
+            with self.assertNumQueries(4):
+                response = self.client.get('/api/recipes/?limit=30')
+        self.assertEqual(len(response.json()['results']), 30)
+        self.assertEqual(
+            sum(
+                RecipeIngredient._meta.db_table in query['sql']
+                for query in queries
+            ),
+            1,
+        )
+
+
+class PaginationTest(APIDataMixin, TestCase):
+    """Пагинация по ключу (?cursor=) и кэш числа записей."""
+
+    def test_cursor_pages(self):
+        url = f'/api/recipes/?author={self.authors[0].id}&cursor=&limit=3'
+        pages = []
+        while url:
+            page = self.client.get(url).json()
+            self.assertNotIn('count', page)
+            pages.append(page)
+            url = page['next']
+        ids = [recipe['id'] for page in pages for recipe in page['results']]
+        expected = sorted(
+            (recipe.id for recipe in self.recipes
+             if recipe.author == self.authors[0]),
+            reverse=True,
+        )
+        self.assertEqual(ids, expected)
+        self.assertIsNone(pages[0]['previous'])
+        self.assertIn(f'author={self.authors[0].id}', pages[1]['previous'])
+        previous = self.client.get(pages[1]['previous']).json()
+        self.assertEqual(previous['results'], pages[0]['results'])
+
+    def test_count_from_cache(self):
+        with mock.patch('api.pagination.PAGINATION_COUNT_CACHE_THRESHOLD', 1):
+            self.assertEqual(
+                self.client.get('/api/recipes/').json()['count'], 40
+            )
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/api/recipes/?page=2')
+        self.assertEqual(response.json()['count'], 40)
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+
+
+class ReferenceUserSerializer(serializers.ModelSerializer):
+    is_subscribed = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = [
+            'email', 'id', 'avatar', 'username', 'first_name', 'last_name',
+            'is_subscribed',
+        ]
+
+    def get_is_subscribed(self, obj):
+        return Subscription.objects.filter(
+            subscriber=self.context['user'], author=obj
+        ).exists()
+
+
+class ReferenceRecipeIngredientSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ['id', 'name', 'measurement_unit', 'amount']
+
+
+class ReferenceRecipeSerializer(serializers.ModelSerializer):
+    author = ReferenceUserSerializer()
+    ingredients = serializers.SerializerMethodField()
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Recipe
+        fields = [
+            'id', 'author', 'ingredients',
+            'is_favorited', 'is_in_shopping_cart',
+            'name', 'image', 'text', 'cooking_time',
+        ]
+
+    def get_ingredients(self, obj):
+        return ReferenceRecipeIngredientSerializer(
+            obj.components.order_by('id'), many=True
+        ).data
+
+    def get_is_favorited(self, obj):
+        return obj.fans.filter(user=self.context['user']).exists()
+
+    def get_is_in_shopping_cart(self, obj):
+        return obj.in_cart.filter(user=self.context['user']).exists()
+
+
+class ReferenceMiniRecipeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Recipe
+        fields = ['id', 'name', 'image', 'cooking_time']
+
+
+class ReferenceSubscriptionSerializer(ReferenceUserSerializer):
+    recipes = serializers.SerializerMethodField()
+    recipes_count = serializers.SerializerMethodField()
+
+    class Meta(ReferenceUserSerializer.Meta):
+        fields = ReferenceUserSerializer.Meta.fields + [
+            'recipes', 'recipes_count',
+        ]
+
+    def get_recipes(self, obj):
+        recipes = obj.recipes.order_by('-id')
+        if self.context.get('recipes_limit'):
+            recipes = recipes[:self.context['recipes_limit']]
+        return ReferenceMiniRecipeSerializer(recipes, many=True).data
+
+    def get_recipes_count(self, obj):
+        return obj.recipes.count()
+
+
+class RowsMatchSerializersTest(APIDataMixin, TestCase):
+    """Выдача из строк values() (api.rows) совпадает поле в поле с
+    обычными ModelSerializer."""
+
+    def assert_same(self, response, serializer_class, instance, **context):
+        context.update(request=response.wsgi_request, user=self.user)
+        expected = serializer_class(
+            instance, many=not isinstance(instance, (Recipe, User)),
+            context=context,
+        ).data
+        data = response.json()
+        if isinstance(data, dict) and 'results' in data:
+            data = data['results']
+        # Сравнение строк JSON учитывает и порядок полей.
+        self.assertEqual(
+            json.dumps(data, ensure_ascii=False, indent=1),
+            json.dumps(expected, ensure_ascii=False, indent=1),
+        )
+
+    def test_recipe_list(self):
+        response = self.client.get('/api/recipes/?limit=40')
+        self.assert_same(
+            response, ReferenceRecipeSerializer, Recipe.objects.all()
+        )
+        # Второй раз — из кэша карточек.
+        response = self.client.get('/api/recipes/?limit=40')
+        self.assert_same(
+            response, ReferenceRecipeSerializer, Recipe.objects.all()
+        )
+
+    def test_recipe_detail(self):
+        for recipe in self.recipes[:5]:
+            with self.subTest(recipe=recipe.id):
+                response = self.client.get(f'/api/recipes/{recipe.id}/')
+                self.assert_same(response, ReferenceRecipeSerializer, recipe)
+
+    def test_subscriptions(self):
+        authors = User.objects.filter(subscribers__subscriber=self.user)
+        for limit in ('', '2'):
+            with self.subTest(recipes_limit=limit):
+                response = self.client.get(
+                    f'/api/users/subscriptions/?recipes_limit={limit}'
+                )
+                self.assert_same(
+                    response, ReferenceSubscriptionSerializer, authors,
+                    recipes_limit=int(limit or 0),
+                )
+
+    def test_subscribe(self):
+        author = self.authors[3]
+        response = self.client.post(
+            f'/api/users/{author.id}/subscribe/?recipes_limit=3'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assert_same(
+            response, ReferenceSubscriptionSerializer, author,
+            recipes_limit=3,
+        )
+
+
+class AsyncRecipeViewsTest(APIDataMixin, TestCase):
+    """Асинхронные список и карточка рецепта отвечают как DRF-view."""
+
+    HEADERS = ('Content-Type', 'Cache-Control', 'Vary', 'Allow', 'ETag')
+
+    async def assert_same(self, view, url, headers, **kwargs):
+        expected = await sync_to_async(APIClient().get)(url, headers=headers)
+        request = AsyncRequestFactory().get(url, headers=headers)
+        response = await view(request, **kwargs)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(json.loads(response.content), expected.json())
+        for header in self.HEADERS:
+            self.assertEqual(response.get(header), expected.get(header))
+
+    async def test_same_as_drf(self):
+        token = await sync_to_async(Token.objects.get)(user=self.user)
+        recipes = with_fallback(recipe_list, router_views['recipe-list'])
+        recipe = with_fallback(recipe_detail, router_views['recipe-detail'])
+        author = self.authors[1].id
+        for headers in ({}, {'Authorization': f'Token {token.key}'}):
+            for query in (
+                '?limit=6', '?limit=5&page=2', '?page=last',
+                '?is_favorited=1', f'?author={author}&is_in_shopping_cart=1',
+            ):
+                with self.subTest(query=query, headers=headers):
+                    await self.assert_same(
+                        recipes, f'/api/recipes/{query}', headers
+                    )
+            for pk in (self.recipes[0].id, self.recipes[1].id):
+                with self.subTest(pk=pk, headers=headers):
+                    await self.assert_same(
+                        recipe, f'/api/recipes/{pk}/', headers, pk=pk
+                    )
+
+    async def test_other_methods_use_drf(self):
+        token = await sync_to_async(Token.objects.get)(user=self.user)
+        headers = {'Authorization': f'Token {token.key}'}
+        views = {
+            '/api/ingredients/': with_fallback(
+                ingredients, router_views['ingredient-list']
+            ),
+            '/api/recipes/download_shopping_cart/': with_fallback(
+                download_shopping_cart,
+                router_views['recipe-download-shopping-cart'],
+                sync_params=set(),
+            ),
+        }
+        factory = AsyncRequestFactory()
+        for url, view in views.items():
+            for method in ('head', 'options', 'post'):
+                with self.subTest(url=url, method=method):
+                    expected = await sync_to_async(
+                        getattr(APIClient(), method)
+                    )(url, headers=headers)
+                    response = await view(
+                        getattr(factory, method)(url, headers=headers)
+                    )
+                    self.assertEqual(
+                        response.status_code, expected.status_code
+                    )
+                    self.assertEqual(response['Allow'], expected['Allow'])
+
+
+class AuthCacheTest(APIDataMixin, TestCase):
+    """Пользователь в кэше аутентификации не отстаёт от счётчиков."""
+
+    def test_counters_reset_cached_user(self):
+        self.client.get('/api/users/me/')
+        subscribers = get_user(self.user.pk).subscribers_count
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscription.objects.create(
+                subscriber=self.authors[0], author=self.user
+            )
+        self.assertEqual(
+            get_user(self.user.pk).subscribers_count, subscribers + 1
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.create(
+                name='Новый рецепт', text='Описание', cooking_time=5,
+                image='recipes/images/recipe.png', author=self.user,
+            )
+        self.assertEqual(get_user(self.user.pk).recipes_count, 1)
+
+
+class ConditionalGetTest(APIDataMixin, TestCase):
+    """ETag и ответ 304 для чтения рецептов."""
+
+    def test_not_modified(self):
+        url = f'/api/recipes/{self.recipes[0].id}/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_changes_after_write(self):
+        recipe = self.recipes[1]
+        url = f'/api/recipes/{recipe.id}/'
+        anonymous = APIClient()
+        etag = self.client.get(url)['ETag']
+        anonymous_etag = anonymous.get(url)['ETag']
+        # Избранное меняет ETag только своему владельцу.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'{url}favorite/')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['is_favorited'])
+        self.assertNotEqual(response['ETag'], etag)
+        response = anonymous.get(url, HTTP_IF_NONE_MATCH=anonymous_etag)
+        self.assertEqual(response.status_code, 304)
+        # Правка рецепта меняет ETag всем.
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.name = 'Новое название'
+            recipe.save()
+        response = anonymous.get(url, HTTP_IF_NONE_MATCH=anonymous_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Новое название')
+        self.assertNotEqual(response['ETag'], anonymous_etag)
+
+
+class RecipeWriteQueriesTest(APIDataMixin, TestCase):
+    """Состав рецепта проверяется и обновляется пачками."""
+
+    def setUp(self):
+        super().setUp()
+        token = Token.objects.create(user=self.authors[0])
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        # Рецепт автора, который лежит в корзине у self.user.
+        self.url = f'/api/recipes/{self.recipes[5].id}/'
+        self.ingredient_ids = list(
+            Ingredient.objects.values_list('id', flat=True)
+        )
+
+    def patch(self, count, amount):
+        return self.client.patch(self.url, {'ingredients': [
+            {'id': pk, 'amount': amount}
+            for pk in self.ingredient_ids[:count]
+        ]}, format='json')
+
+    def test_queries_do_not_depend_on_ingredients(self):
+        self.patch(2, 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.patch(4, 1)
+        # Добавление шести ингредиентов вместо двух, затем изменение
+        # количества у всех — столько же запросов.
+        with self.assertNumQueries(len(queries)):
+            self.patch(10, 1)
+        with self.assertNumQueries(len(queries)):
+            response = self.patch(10, 2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['amount'] for item in response.json()['ingredients']],
+            [2] * 10,
+        )
+
+    def test_unknown_ingredients_reported_together(self):
+        response = self.client.patch(self.url, {'ingredients': [
+            {'id': self.ingredient_ids[0], 'amount': 1},
+            {'id': 999998, 'amount': 1},
+            {'id': 999999, 'amount': 1},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('999998, 999999', str(response.json()['ingredients']))
+
+
+class UploadTest(APIDataMixin, TestCase):
+    """Загрузка изображения файлом и ссылка на неё в avatar."""
+
+    def setUp(self):
+        super().setUp()
+        media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+
+    def upload(self, name, content):
+        return self.client.post('/api/uploads/', {
+            'file': SimpleUploadedFile(name, content),
+        })
+
+    def upload_image(self):
+        image = BytesIO()
+        Image.new('RGB', (8, 8), 'red').save(image, 'PNG')
+        return self.upload('avatar.png', image.getvalue())
+
+    def test_image_upload_used_as_avatar(self):
+        response = self.upload_image()
+        self.assertEqual(response.status_code, 201)
+        response = self.client.put(
+            '/api/users/me/avatar/', {'avatar': response.json()['upload']},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['avatar'].endswith('.png'))
+
+    def test_not_an_image(self):
+        response = self.upload('avatar.png', b'not an image at all')
+        self.assertEqual(response.status_code, 415)
+
+    def test_too_large(self):
+        with mock.patch('api.uploads.UPLOAD_MAX_SIZE', 16):
+            response = self.upload('avatar.png', b'\x89PNG\r\n\x1a\n' * 4)
+        self.assertEqual(response.status_code, 413)
+
+    def test_foreign_upload_rejected(self):
+        upload = self.upload_image().json()['upload']
+        other = APIClient()
+        other.force_authenticate(self.authors[0])
+        response = other.put(
+            '/api/users/me/avatar/', {'avatar': upload}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ShoppingListExportTest(APIDataMixin, TestCase):
+    """Выгрузка списка покупок в txt, csv и json."""
+
+    url = '/api/recipes/download_shopping_cart/'
+
+    def expected(self):
+        amounts, recipes = Counter(), Counter()
+        for component in RecipeIngredient.objects.filter(
+            recipe__in_cart__user=self.user
+        ).select_related('ingredient'):
+            ingredient = component.ingredient
+            amounts[ingredient] += component.amount
+            recipes[ingredient] += 1
+        return [
+            {
+                'id': ingredient.id,
+                'name': ingredient.name,
+                'measurement_unit': ingredient.measurement_unit,
+                'amount': amounts[ingredient],
+                'recipe_count': recipes[ingredient],
+            }
+            for ingredient in sorted(amounts, key=lambda item: item.name)
+        ]
+
+    def download(self, export_format, **kwargs):
+        response = self.client.get(
+            f'{self.url}?format={export_format}', **kwargs
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Disposition'],
+            f'attachment; filename="shopping_list.{export_format}"',
+        )
+        return b''.join(response.streaming_content).decode()
+
+    def test_json(self):
+        self.assertEqual(json.loads(self.download('json')), self.expected())
+
+    def test_csv(self):
+        rows = list(csv.DictReader(self.download('csv').splitlines()))
+        self.assertEqual(rows, [
+            {field: str(value) for field, value in item.items()}
+            for item in self.expected()
+        ])
+
+    def test_txt(self):
+        lines = self.download('txt').splitlines()
+        self.assertEqual(lines[:2], ['Список покупок:', ''])
+        self.assertEqual(lines[2:], [
+            f"{item['name']} {item['measurement_unit']} — {item['amount']} "
+            f"(в {item['recipe_count']} рецептах)"
+            for item in self.expected()
+        ])
+
+    def test_format_from_accept(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='text/csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+
+    def test_anonymous(self):
+        self.assertEqual(APIClient().get(self.url).status_code, 401)
+
+
+class ShortLinkTest(APIDataMixin, TestCase):
+    """Короткие ссылки /s/<код> ведут на страницу рецепта."""
+
+    def test_get_link_redirects(self):
+        recipe = self.recipes[0]
+        response = self.client.get(f'/api/recipes/{recipe.id}/get-link/')
+        link = response.json()['short-link']
+        self.assertTrue(link.endswith(f'/s/{encode(recipe.id)}'))
+        response = APIClient().get(link)
+        self.assertRedirects(
+            response, f'/recipes/{recipe.id}', fetch_redirect_response=False
+        )
+        self.assertIn('public', response['Cache-Control'])
+        # Повторный переход берёт id из памяти воркера.
+        with self.assertNumQueries(0):
+            APIClient().get(link)
+
+    def test_unknown_code(self):
+        for code in (encode(10 ** 6), 'не-код', '00'):
+            with self.subTest(code=code):
+                self.assertEqual(
+                    APIClient().get(f'/s/{code}').status_code, 404
+                )
+        response = self.client.get('/api/recipes/1000000/get-link/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_deleted_recipe(self):
+        recipe = self.recipes[0]
+        link = f'/s/{encode(recipe.id)}'
+        self.assertEqual(APIClient().get(link).status_code, 302)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.assertEqual(APIClient().get(link).status_code, 404)
+
+    async def test_async_view(self):
+        recipe = self.recipes[1]
+        code = encode(recipe.id)
+        response = await short_link(
+            AsyncRequestFactory().get(f'/s/{code}'), code
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], f'/recipes/{recipe.id}')
+        with self.assertRaises(Http404):
+            await short_link(
+                AsyncRequestFactory().get('/s/zzzzzz'), 'zzzzzz'
+            )
+
+
+class ImageVariantsTest(APIDataMixin, TestCase):
+    """Копии изображений отдаются только по ?include=image_variants."""
+
+    def setUp(self):
+        super().setUp()
+        # Копии не строятся: отдаются ссылки на оригинал.
+        self.enterContext(mock.patch('api.images.schedule_variants'))
+
+    def test_favorite_and_cart_responses(self):
+        recipe = self.recipes[2]
+        for action in ('favorite', 'shopping_cart'):
+            url = f'/api/recipes/{recipe.id}/{action}/'
+            with self.subTest(action=action):
+                response = self.client.post(url)
+                self.assertEqual(
+                    list(response.json()),
+                    ['id', 'name', 'image', 'cooking_time'],
+                )
+                self.client.delete(url)
+                response = self.client.post(f'{url}?include=image_variants')
+                self.assertEqual(response.status_code, 201)
+                variants = response.json()['image_variants']
+                self.assertTrue(variants)
+                for formats in variants.values():
+                    for link in formats.values():
+                        self.assertTrue(link.startswith('http://testserver/'))
+
+    def test_subscription_recipes(self):
+        response = self.client.get(
+            '/api/users/subscriptions/?include=image_variants'
+        )
+        for author in response.json()['results']:
+            for recipe in author['recipes']:
+                self.assertIn('image_variants', recipe)
+        response = self.client.get('/api/users/subscriptions/')
+        for author in response.json()['results']:
+            for recipe in author['recipes']:
+                self.assertNotIn('image_variants', recipe)
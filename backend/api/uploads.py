@@ -0,0 +1,114 @@
+"""Загрузка изображений отдельным запросом, без base64 в JSON.
+
+Файл из multipart- или бинарного тела пишется во временный файл
+кусками, а размер и тип проверяются по мере чтения — до того, как
+прочитано всё тело. Сохранённая загрузка возвращается клиенту как
+подписанная ссылка, которую затем можно передать в поле image рецепта
+или avatar пользователя вместо base64-строки. Ссылка привязана к
+пользователю и действует UPLOAD_MAX_AGE секунд.
+"""
+import os
+from uuid import uuid4
+
+from django.core import signing
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework import exceptions, status
+
+from utils.constants import UPLOAD_DIR, UPLOAD_MAX_AGE, UPLOAD_MAX_SIZE
+
+# Сигнатуры поддерживаемых форматов: первые байты файла и расширение.
+SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+
+# Запас на заголовки multipart сверх размера самого файла.
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(exceptions.APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Размер файла превышает допустимый.'
+    default_code = 'upload_too_large'
+
+
+def image_extension(head):
+    """Расширение по первым байтам файла или None для других типов."""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Пишет файл на диск и обрывает загрузку при нарушении лимитов."""
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > UPLOAD_MAX_SIZE + MULTIPART_OVERHEAD:
+            raise UploadTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.extension = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0:
+            self.extension = image_extension(raw_data)
+            if self.extension is None:
+                self.file.close()
+                raise exceptions.UnsupportedMediaType(self.content_type)
+        if start + len(raw_data) > UPLOAD_MAX_SIZE:
+            self.file.close()
+            raise UploadTooLarge()
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.extension = self.extension
+        return file
+
+
+def _salt(user):
+    return f'api.uploads:{user.pk}'
+
+
+def store_upload(file, user):
+    """Сохраняет загруженный файл и возвращает ссылку на него."""
+    name = default_storage.save(
+        f'{UPLOAD_DIR}/{uuid4().hex}.{file.extension}', file
+    )
+    return signing.dumps(name, salt=_salt(user))
+
+
+class StoredUpload(File):
+    """Ранее загруженный файл, переданный по ссылке."""
+
+    def __init__(self, name):
+        self.storage_name = name
+        super().__init__(
+            default_storage.open(name), name=os.path.basename(name)
+        )
+
+    def temporary_file_path(self):
+        # Хранилище на диске перемещает такой файл, а не копирует его.
+        return default_storage.path(self.storage_name)
+
+
+def open_upload(reference, user):
+    """Файл по ссылке из store_upload или None, если ссылка негодна."""
+    try:
+        name = signing.loads(
+            reference, salt=_salt(user), max_age=UPLOAD_MAX_AGE
+        )
+    except signing.BadSignature:
+        return None
+    if not default_storage.exists(name):
+        return None
+    return StoredUpload(name)
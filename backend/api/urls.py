@@ -1,10 +1,13 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .views import (
     UserViewSet,
     IngredientViewSet,
     RecipeViewSet,
+    UploadView,
     redirect_to_recipe,
 )
 
@@ -14,8 +17,49 @@ router.register("users", UserViewSet)
 router.register("recipes", RecipeViewSet)
 router.register("ingredients", IngredientViewSet)
 
+# Под ASGI горячие эндпоинты обслуживают асинхронные view; они стоят
+# раньше маршрутов роутера с теми же путями.
+router_views = {url.name: url.callback for url in router.urls}
+async_urlpatterns = [
+    path(
+        "ingredients/",
+        async_views.with_fallback(
+            async_views.ingredients, router_views["ingredient-list"]
+        ),
+    ),
+    path(
+        "recipes/download_shopping_cart/",
+        # Формат выгрузки асинхронный view выбирает сам, в том числе
+        # по ?format=.
+        async_views.with_fallback(
+            async_views.download_shopping_cart,
+            router_views["recipe-download-shopping-cart"],
+            sync_params=set(),
+        ),
+    ),
+    path(
+        "recipes/",
+        async_views.with_fallback(
+            async_views.recipe_list, router_views["recipe-list"]
+        ),
+    ),
+    path(
+        "recipes/<int:pk>/",
+        async_views.with_fallback(
+            async_views.recipe_detail, router_views["recipe-detail"]
+        ),
+    ),
+    path('r/<int:recipe_id>/', async_views.redirect_to_recipe),
+]
+
 urlpatterns = [
+    *(async_urlpatterns if settings.ASYNC_VIEWS else []),
     path("auth/", include("djoser.urls.authtoken")),
+    *(
+        [path("auth/", include("djoser.urls.jwt"))]
+        if settings.AUTH_MODE == "jwt" else []
+    ),
+    path("uploads/", UploadView.as_view(), name="uploads"),
     path("", include(router.urls)),
     path('r/<int:recipe_id>/', redirect_to_recipe, name='redirect_to_recipe'),
 ]
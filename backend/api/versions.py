@@ -0,0 +1,65 @@
+"""Версии моделей для условных GET-запросов.
+
+Версия — отметка времени последнего изменения в кэше. Она меняется
+после каждого коммита, затрагивающего модель. Связи пользователя
+(избранное, корзина, подписки) версионируются отдельно для каждого
+владельца в api.relations, чтобы чужие действия не сбрасывали его ETag.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+User = get_user_model()
+
+VERSIONED_MODELS = (Ingredient, Recipe, RecipeIngredient, User)
+
+
+def model_version_key(model):
+    return f'version:{model._meta.label_lower}'
+
+
+def get_versions(keys):
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [str(versions[key]) for key in keys]
+
+
+async def aget_versions(keys):
+    versions = await cache.aget_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        await cache.aset_many(missing, None)
+        versions.update(missing)
+    return [str(versions[key]) for key in keys]
+
+
+def bump_version(key):
+    transaction.on_commit(lambda: cache.set(key, time.time_ns(), None))
+
+
+def _on_change(sender, update_fields=None, **kwargs):
+    # Вход по токену обновляет только last_login — на выдачу это не влияет.
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    bump_version(model_version_key(sender))
+
+
+def _on_ingredients_change(sender, **kwargs):
+    bump_version(model_version_key(RecipeIngredient))
+
+
+def connect_signals():
+    for model in VERSIONED_MODELS:
+        post_save.connect(_on_change, sender=model)
+        post_delete.connect(_on_change, sender=model)
+    m2m_changed.connect(
+        _on_ingredients_change, sender=Recipe.ingredients.through
+    )
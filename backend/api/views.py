@@ -1,25 +1,31 @@
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.db.models import Count, Sum
+from django.db.models import Exists, OuterRef
 from django.shortcuts import get_object_or_404, redirect
-from django.http import Http404, HttpResponse
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
 from djoser.views import UserViewSet as DjoserUserViewSet
+from rest_framework.parsers import FileUploadParser, MultiPartParser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, permissions, status, viewsets
+from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 
-from recipes.models import (
-    Favorite,
-    Ingredient,
-    Recipe,
-    RecipeIngredient,
-    ShoppingCart,
-)
+from recipes.feed import feed_filter
+from recipes.models import Ingredient, Recipe, RecipeIngredient
 from users.models import Subscription
+from utils.constants import SHORT_LINK_CACHE_MAX_AGE
 
 from .filters import RecipeFilter
+from .mixins import ConditionalGetMixin
+from .pagination import KeysetPagination
 from .permissions import IsAuthorOrReadOnly
+from .relations import annotate_flags, get_relations
+from .renderers import CSVRenderer, PlainTextRenderer
+from .rows import MINI_RECIPE_FIELDS, USER_FIELDS
+from .search import get_ingredient_index
 from .serializers import (
     AvatarSerializer,
     UserSerializer,
@@ -31,20 +37,61 @@ from .serializers import (
     ShoppingCartSerializer,
     SubscriptionCreateSerializer,
     SubscriptionSerializer,
+    requested_fields,
 )
+from .shopping_list import export, shopping_list
+from .short_links import decode, encode, recipe_exists
+from .uploads import ImageUploadHandler, store_upload
 
 User = get_user_model()
 
 
+def annotate_is_subscribed(queryset, user):
+    """Добавляет к выборке пользователей флаг подписки текущего юзера."""
+    return queryset.annotate(
+        is_subscribed=Exists(
+            Subscription.objects.filter(
+                author=OuterRef('pk'), subscriber=user
+            )
+        )
+    )
+
+
 def redirect_to_recipe(request, recipe_id):
-    if not Recipe.objects.filter(pk=recipe_id).exists():
+    """Редирект на страницу рецепта, который шлюз может кэшировать."""
+    if not recipe_exists(recipe_id):
+        raise Http404('Рецепт не найден')
+    response = redirect(f'/recipes/{recipe_id}')
+    patch_cache_control(
+        response, public=True, max_age=SHORT_LINK_CACHE_MAX_AGE
+    )
+    return response
+
+
+def short_link(request, code):
+    recipe_id = decode(code)
+    if recipe_id is None:
         raise Http404('Рецепт не найден')
-    return redirect('recipe_detail', pk=recipe_id)
+    return redirect_to_recipe(request, recipe_id)
 
 
-class UserViewSet(DjoserUserViewSet):
+class UserViewSet(ConditionalGetMixin, DjoserUserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    versioned_models = (User,)
+    user_relations = ('subscriptions',)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        fields = requested_fields(self.request, UserSerializer.Meta.fields)
+        if (
+            user.is_authenticated
+            and 'is_subscribed' in fields
+            and get_relations(self.request).ids['subscriptions'] is None
+        ):
+            queryset = annotate_is_subscribed(queryset, user)
+        return queryset
 
     @action(
         detail=False,
@@ -72,14 +119,18 @@ class UserViewSet(DjoserUserViewSet):
             serializer = AvatarSerializer(
                 request.user,
                 data=request.data,
-                partial=True
+                partial=True,
+                context={'request': request}
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         if request.user.avatar:
-            request.user.avatar.delete()
+            # Файл может быть общим с другими записями (см. utils.storage),
+            # поэтому только отвязываем его; удалит его clean_media.
+            request.user.avatar = ''
+            request.user.save(update_fields=['avatar'])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -128,9 +179,8 @@ class UserViewSet(DjoserUserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        authors = User.objects.filter(subscribers__subscriber=user).annotate(
-            recipes_count=Count('recipes')
-        )
+        authors = User.objects.filter(subscribers__subscriber=user)
+        authors = authors.values(*USER_FIELDS, 'recipes_count')
 
         page = self.paginate_queryset(authors)
         context = {
@@ -142,26 +192,68 @@ class UserViewSet(DjoserUserViewSet):
         return self.get_paginated_response(serializer.data)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    versioned_models = (Ingredient,)
     pagination_class = None
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['^name']
 
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(self.autocomplete, request)
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.select_related(
-        'author'
-    ).prefetch_related(
-        'components__ingredient'
-    )
+    def autocomplete(self, request):
+        """Ингредиенты по началу названия или, при ?mode=fuzzy, с учётом
+        опечаток — из индекса в памяти."""
+        limit = request.query_params.get('limit')
+        limit = int(limit) if limit and limit.isdigit() else None
+        name = request.query_params.get('name', '')
+        index = get_ingredient_index()
+        if name and request.query_params.get('mode') == 'fuzzy':
+            return Response(index.fuzzy(name, limit))
+        return Response(index.startswith(name, limit))
+
+
+class RecipeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Recipe.objects.select_related('author')
     permission_classes = [
         permissions.IsAuthenticatedOrReadOnly,
         IsAuthorOrReadOnly
     ]
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    versioned_models = (Recipe, RecipeIngredient, Ingredient, User)
+    user_relations = ('favorites', 'shopping_cart', 'subscriptions')
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = self.queryset
+        if self.action == 'retrieve':
+            # Текст рецепта приходит из кэша карточек.
+            queryset = queryset.defer('text')
+        if not user.is_authenticated:
+            return queryset
+        if self.action == 'feed':
+            queryset = queryset.filter(feed_filter(user))
+        # Флаги берутся из кэша связей; подзапросы нужны только тем,
+        # у кого связей больше лимита кэша, и только для запрошенных полей.
+        fields = requested_fields(
+            self.request, RecipeReadSerializer.Meta.fields
+        )
+        if not {'author', 'is_favorited', 'is_in_shopping_cart'} & {*fields}:
+            return queryset
+        return annotate_flags(
+            queryset, user, get_relations(self.request), fields
+        )
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in ('list', 'feed'):
+            # Выдача собирается из кэша карточек, модели для неё не нужны.
+            return queryset.values(
+                *MINI_RECIPE_FIELDS, 'author_id', 'updated_at',
+                *queryset.query.annotations
+            )
+        return queryset
 
     def get_serializer_class(self):
         if self.request.method in ['POST', 'PUT', 'PATCH']:
@@ -171,16 +263,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-    def _generate_shopping_list(self, ingredients):
-        text = 'Список покупок:\n\n'
-        for item in ingredients:
-            text += (
-                f"{item['ingredient__name']} "
-                f"{item['ingredient__measurement_unit']} — "
-                f"{item['total']} "
-                f"(в {item['recipe_count']} рецептах)\n"
-            )
-        return text
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[permissions.IsAuthenticated],
+        pagination_class=KeysetPagination,
+    )
+    def feed(self, request):
+        """Новые рецепты авторов, на которых подписан пользователь."""
+        return self.list(request)
 
     @action(
         detail=True,
@@ -188,40 +279,44 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_path='get-link',
     )
     def get_link(self, request, pk):
-        if not Recipe.objects.filter(pk=pk).exists():
+        if not pk.isdigit() or not recipe_exists(int(pk)):
             return Response(
                 {'detail': 'Recipe not found.'},
                 status=status.HTTP_404_NOT_FOUND
             )
         short_link = request.build_absolute_uri(
-            reverse('redirect_to_recipe', kwargs={'recipe_id': pk})
+            reverse('short_link', kwargs={'code': encode(int(pk))})
         )
         return Response({'short-link': short_link}, status=status.HTTP_200_OK)
 
     @action(
         detail=False,
         methods=['get'],
-        permission_classes=[permissions.IsAuthenticated]
+        permission_classes=[permissions.IsAuthenticated],
+        renderer_classes=[PlainTextRenderer, CSVRenderer, JSONRenderer],
     )
     def download_shopping_cart(self, request):
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__in_cart__user=request.user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(
-            total=Sum('amount'),
-            recipe_count=Count('recipe', distinct=True)
+        export_format = request.accepted_renderer.format
+        response = StreamingHttpResponse(
+            export(export_format, shopping_list(request.user)),
+            content_type=(
+                f'{request.accepted_renderer.media_type}; charset=utf-8'
+            ),
         )
-
-        text = self._generate_shopping_list(ingredients)
-
-        response = HttpResponse(text, content_type='text/plain')
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"'
+            f'attachment; filename="shopping_list.{export_format}"'
         )
         return response
 
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='shopping_list',
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def shopping_list_preview(self, request):
+        return Response(list(shopping_list(request.user)))
+
     @action(
         url_path='favorite',
         detail=True,
@@ -287,3 +382,30 @@ class RecipeViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadView(APIView):
+    """Загрузка изображения файлом: multipart-поле file или тело запроса.
+
+    Возвращает ссылку, которую можно передать в image или avatar.
+    """
+
+    parser_classes = [MultiPartParser, FileUploadParser]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        # Обработчик нужно подменить до первого чтения request.data.
+        request._request.upload_handlers = [
+            ImageUploadHandler(request._request)
+        ]
+        file = request.data.get('file')
+        if file is None:
+            return Response(
+                {'file': ['Файл не передан']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            upload = store_upload(file, request.user)
+        finally:
+            file.close()
+        return Response({'upload': upload}, status=status.HTTP_201_CREATED)
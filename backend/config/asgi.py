@@ -2,6 +2,10 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+from utils.constants import API_STATEMENT_TIMEOUT
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('DB_STATEMENT_TIMEOUT', str(API_STATEMENT_TIMEOUT))
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
@@ -1,13 +1,20 @@
+import os
+from datetime import timedelta
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
-SECRET_KEY = 'django-insecure-+b^94z4*7rov62)off^o6h$1=_9+=e!a!$7f*67phi$bksdrf0'
+SECRET_KEY = os.getenv(
+    'SECRET_KEY',
+    'django-insecure-+b^94z4*7rov62)off^o6h$1=_9+=e!a!$7f*67phi$bksdrf0'
+)
 
-DEBUG = True
+DEBUG = os.getenv('DEBUG', 'True') == 'True'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [
+    host for host in os.getenv('ALLOWED_HOSTS', '').split(',') if host
+]
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -57,12 +64,84 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=django.db.backends.postgresql (как в .env для docker compose)
+# включает PostgreSQL, без него — SQLite для разработки и тестов.
+if os.getenv('DB_ENGINE') == 'django.db.backends.postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'foodgram'),
+            'USER': os.getenv('POSTGRES_USER', 'foodgram'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'foodgram_db'),
+            'PORT': int(os.getenv('DB_PORT', 5432)),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    # persistent — соединение живёт CONN_MAX_AGE секунд и переиспользуется
+    # запросами воркера; pool — пул psycopg в каждом воркере; pgbouncer —
+    # соединения через PgBouncer в режиме transaction pooling.
+    DB_CONNECTION_MODE = os.getenv('DB_CONNECTION_MODE', 'persistent')
+    # Лимит на один SQL-запрос в миллисекундах; config.wsgi и config.asgi
+    # задают его по умолчанию для API, management-команды работают без
+    # лимита. PgBouncer не пропускает параметр options — там лимит
+    # задаётся для роли: ALTER ROLE ... SET statement_timeout.
+    DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', 0))
+    options = DATABASES['default']['OPTIONS']
+    if DB_CONNECTION_MODE == 'pool':
+        # Пул сам держит соединения, CONN_MAX_AGE с ним несовместим.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        options['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 4)),
+            'timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+        }
+    if DB_CONNECTION_MODE == 'pgbouncer':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+    elif DB_STATEMENT_TIMEOUT:
+        options['options'] = f'-c statement_timeout={DB_STATEMENT_TIMEOUT}'
+else:
+    # Настройки для нескольких воркеров на одном сервере: WAL не блокирует
+    # чтение записью, транзакции сразу берут блокировку на запись (BEGIN
+    # IMMEDIATE), а занятая база ждёт timeout секунд вместо ошибки
+    # «database is locked». synchronous=NORMAL в режиме WAL не портит
+    # базу при сбое, но может потерять последние транзакции.
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA mmap_size=134217728;'
+                    'PRAGMA cache_size=-20000;'
+                    'PRAGMA temp_store=MEMORY'
+                ),
+            },
+        }
+    }
+
+# Кэш связей пользователей и версий моделей должен быть общим для всех
+# воркеров, поэтому в продакшене нужен Redis; локальный кэш годится только
+# для одного процесса (runserver, тесты).
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
-}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -91,16 +170,42 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
 
+# Асинхронные версии горячих эндпоинтов (api.async_views); включается
+# config.asgi, под WSGI остаются синхронные view.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+
+# token — токены djoser (по умолчанию); jwt — дополнительно короткоживущие
+# JWT (/api/auth/jwt/create/), которые проверяются без запросов к базе.
+AUTH_MODE = os.getenv('AUTH_MODE', 'token')
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(
+        minutes=int(os.getenv('JWT_ACCESS_MINUTES', 5))
+    ),
+    'REFRESH_TOKEN_LIFETIME': timedelta(
+        days=int(os.getenv('JWT_REFRESH_DAYS', 1))
+    ),
+    'AUTH_HEADER_TYPES': ('Bearer',),
+    'UPDATE_LAST_LOGIN': False,
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly'
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication'
+        *(
+            ['api.authentication.StatelessJWTAuthentication']
+            if AUTH_MODE == 'jwt' else []
+        ),
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.CustomPageNumberPagination',
     'SEARCH_PARAM': 'name',
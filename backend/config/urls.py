@@ -1,8 +1,17 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from api import async_views, views
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/', include('api.urls'))
-]
+    path('api/', include('api.urls')),
+    path(
+        's/<str:code>',
+        async_views.short_link if settings.ASYNC_VIEWS else views.short_link,
+        name='short_link',
+    ),
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -2,6 +2,9 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from utils.constants import API_STATEMENT_TIMEOUT
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('DB_STATEMENT_TIMEOUT', str(API_STATEMENT_TIMEOUT))
 
 application = get_wsgi_application()
@@ -1,46 +1,66 @@
 from django.contrib import admin
 
+from utils.admin import LargeTableAdminMixin
+
 from .models import (
     Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart
 )
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
     search_fields = ('user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
     ordering = ('id',)
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
     search_fields = ('user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
     ordering = ('id',)
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'measurement_unit')
-    search_fields = ('name',)
+    search_fields = ('^name',)
     ordering = ('id',)
 
 
+class RecipeIngredientInline(admin.TabularInline):
+    model = RecipeIngredient
+    autocomplete_fields = ('ingredient',)
+    min_num = 1
+    extra = 0
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'ingredient', 'recipe'
+        )
+
+
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'author', 'name', 'favorite_count')
+class RecipeAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = (
+        'id', 'author', 'name', 'favorites_count', 'shopping_cart_count'
+    )
+    list_select_related = ('author',)
     search_fields = ('name', 'author__username')
+    autocomplete_fields = ('author',)
+    readonly_fields = ('favorites_count', 'shopping_cart_count')
+    inlines = (RecipeIngredientInline,)
     ordering = ('id',)
-    list_filter = ('author',)
-
-    def favorite_count(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
-
-    favorite_count.short_description = 'Число добавлений в избранное'
 
 
 @admin.register(RecipeIngredient)
-class RecipeIngredientAdmin(admin.ModelAdmin):
+class RecipeIngredientAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'ingredient', 'recipe', 'amount')
+    list_select_related = ('ingredient', 'recipe')
     search_fields = ('ingredient__name', 'recipe__name')
+    autocomplete_fields = ('ingredient', 'recipe')
     ordering = ('id',)
@@ -0,0 +1,69 @@
+"""Счётчики в строках рецептов и пользователей.
+
+Число добавлений в избранное и в корзину, рецептов, подписчиков и
+подписок хранится в столбцах и меняется выражением F() при создании и
+удалении связи, чтобы выдача и админка не считали их агрегатами.
+Расхождения исправляет команда reconcile_counters.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from users.models import Subscription
+
+from .models import Favorite, Recipe, ShoppingCart
+
+User = get_user_model()
+
+# (модель со счётчиком, счётчик, модель связи, поле связи).
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'shopping_cart_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscription, 'author'),
+    (User, 'subscriptions_count', Subscription, 'subscriber'),
+)
+
+
+def counters_of(sender):
+    return [
+        (model, counter, field)
+        for model, counter, source, field in COUNTERS
+        if source is sender
+    ]
+
+
+def shift(model, pk, counter, delta):
+    # Не уходим ниже нуля, даже если счётчик уже разошёлся со связями.
+    model.objects.filter(pk=pk).update(
+        **{counter: Greatest(F(counter) + delta, 0)}
+    )
+
+
+def counted(source, field):
+    """Подзапрос с числом связей для строки внешнего запроса."""
+    return Coalesce(
+        Subquery(
+            source.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                total=Count('pk')
+            ).values('total')
+        ),
+        0,
+    )
+
+
+def link_created(sender, instance, created=False, **kwargs):
+    if created:
+        for model, counter, field in counters_of(sender):
+            shift(model, getattr(instance, f'{field}_id'), counter, 1)
+
+
+def link_deleted(sender, instance, origin=None, **kwargs):
+    for model, counter, field in counters_of(sender):
+        pk = getattr(instance, f'{field}_id')
+        # Строка со счётчиком удаляется сама — обновлять её незачем.
+        if isinstance(origin, model) and origin.pk == pk:
+            continue
+        shift(model, pk, counter, -1)
@@ -0,0 +1,97 @@
+"""Ленты подписок, собранные при записи.
+
+Новый рецепт сразу раскладывается по лентам подписчиков автора
+(FeedEntry), и лента читается одним индексным запросом. Рецепты авторов,
+у которых подписчиков больше FEED_FANOUT_MAX_FOLLOWERS, не
+раскладываются — они подмешиваются при чтении. Ленты обрезаются до
+FEED_MAX_SIZE последних рецептов после подписки и командой prune_feeds:
+запись рецепта не ждёт оконного запроса по лентам всех подписчиков.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from users.models import Subscription
+from utils.constants import FEED_FANOUT_MAX_FOLLOWERS, FEED_MAX_SIZE
+
+from .models import FeedEntry, Recipe
+
+User = get_user_model()
+
+
+def is_large(author_id):
+    return User.objects.filter(
+        pk=author_id, subscribers_count__gt=FEED_FANOUT_MAX_FOLLOWERS
+    ).exists()
+
+
+def prune(user_ids):
+    """Удаляет из лент всё, что старше FEED_MAX_SIZE последних рецептов.
+
+    Возвращает число удалённых записей.
+    """
+    stale = FeedEntry.objects.filter(user_id__in=user_ids).alias(
+        position=Window(
+            RowNumber(),
+            partition_by=F('user_id'),
+            order_by=F('recipe_id').desc(),
+        )
+    ).filter(position__gt=FEED_MAX_SIZE).values_list('pk', flat=True)
+    deleted, _ = FeedEntry.objects.filter(pk__in=list(stale)).delete()
+    return deleted
+
+
+def fan_out(recipe_id, author_id):
+    """Добавляет новый рецепт в ленты подписчиков автора."""
+    if is_large(author_id):
+        return
+    followers = list(
+        Subscription.objects.filter(
+            author_id=author_id
+        ).values_list('subscriber_id', flat=True)
+    )
+    if not followers:
+        return
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, recipe_id=recipe_id)
+            for user_id in followers
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние рецепты автора после подписки."""
+    if is_large(author_id):
+        return
+    recipe_ids = Recipe.objects.filter(
+        author_id=author_id
+    ).order_by('-id').values_list('id', flat=True)[:FEED_MAX_SIZE]
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, recipe_id=recipe_id)
+            for recipe_id in recipe_ids
+        ],
+        ignore_conflicts=True,
+    )
+    prune([user_id])
+
+
+def drop(user_id, author_id):
+    """Убирает рецепты автора из ленты после отписки."""
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()
+
+
+def feed_filter(user):
+    """Условие на рецепты ленты: из FeedEntry и от крупных авторов."""
+    large_authors = Subscription.objects.filter(
+        subscriber=user,
+        author__subscribers_count__gt=FEED_FANOUT_MAX_FOLLOWERS,
+    ).values('author')
+    return (
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('recipe'))
+        | Q(author__in=large_authors)
+    )
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.2 on 2026-10-17 06:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+# Значения FEED_MAX_SIZE и FEED_FANOUT_MAX_FOLLOWERS на момент миграции.
+FEED_MAX_SIZE = 500
+FEED_FANOUT_MAX_FOLLOWERS = 1000
+
+
+def fill_feeds(apps, schema_editor):
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Subscription = apps.get_model('users', 'Subscription')
+    large_authors = Subscription.objects.values('author').annotate(
+        followers=Count('pk')
+    ).filter(followers__gt=FEED_FANOUT_MAX_FOLLOWERS).values('author')
+    subscriptions = Subscription.objects.exclude(
+        author__in=large_authors
+    ).values_list('subscriber_id', 'author_id')
+    for subscriber_id, author_id in subscriptions.iterator():
+        FeedEntry.objects.bulk_create([
+            FeedEntry(user_id=subscriber_id, recipe_id=recipe_id)
+            for recipe_id in Recipe.objects.filter(
+                author_id=author_id
+            ).order_by('-id').values_list('id', flat=True)[:FEED_MAX_SIZE]
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_shoppinglistitem'),
+        ('users', '0006_alter_user_avatar'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи лент',
+                'constraints': [models.UniqueConstraint(fields=('user', 'recipe'), name='unique_user_recipe_feed')],
+            },
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
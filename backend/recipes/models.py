@@ -2,6 +2,9 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
 
+from utils.models import CounterFieldsMixin
+from utils.storage import content_storage
+
 User = get_user_model()
 
 
@@ -29,7 +32,7 @@ class Ingredient(models.Model):
         return f'{self.name}, {self.measurement_unit}'
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     name = models.CharField(
         'Название',
         max_length=256,
@@ -37,6 +40,7 @@ class Recipe(models.Model):
     image = models.ImageField(
         'Изображение',
         upload_to='recipes/',
+        storage=content_storage,
     )
     text = models.TextField(
         'Описание',
@@ -60,8 +64,26 @@ class Recipe(models.Model):
             MaxValueValidator(1 * 60 * 24)
         ],
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
+    # Счётчики поддерживает recipes.counters.
+    favorites_count = models.PositiveIntegerField(
+        'Число добавлений в избранное',
+        default=0,
+        editable=False,
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        'Число добавлений в корзину',
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('favorites_count', 'shopping_cart_count')
 
     class Meta:
+        ordering = ['-id']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -132,6 +154,72 @@ class ShoppingCart(models.Model):
         return f'{self.recipe} в корзине {self.user}'
 
 
+class ShoppingListItem(models.Model):
+    """Сумма ингредиента по корзине пользователя.
+
+    Поддерживается при изменении корзины и состава рецептов
+    (см. recipes.shopping), чтобы список покупок читался одним запросом.
+    """
+
+    user = models.ForeignKey(
+        User,
+        related_name='shopping_list',
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE,
+    )
+    amount = models.PositiveIntegerField('Количество')
+    recipe_count = models.PositiveIntegerField('Число рецептов')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_user_ingredient_shopping_list',
+            ),
+        ]
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+
+    def __str__(self):
+        return f'{self.amount} {self.ingredient} для {self.user}'
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписчика (см. recipes.feed)."""
+
+    user = models.ForeignKey(
+        User,
+        related_name='feed',
+        verbose_name='Подписчик',
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name='feed_entries',
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_user_recipe_feed',
+            ),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+
 class Favorite(models.Model):
     user = models.ForeignKey(
         User,
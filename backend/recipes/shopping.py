@@ -0,0 +1,75 @@
+"""Поддержка сумм списков покупок (ShoppingListItem).
+
+Суммы пересчитываются из корзины и состава рецептов только для
+затронутых пар «пользователь — ингредиент»: удалить старые строки,
+посчитать и вставить новые — три запроса на любое изменение (и
+блокировка строк пользователей).
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+User = get_user_model()
+
+
+def compute_totals(user_ids=None, ingredient_ids=None):
+    """Суммы по корзинам: (user_id, ingredient_id, amount, recipe_count)."""
+    # Условия на корзину — в одном filter(), иначе Django добавит
+    # второй JOIN и суммы задвоятся.
+    lookups = {'recipe__in_cart__isnull': False}
+    if user_ids is not None:
+        lookups['recipe__in_cart__user__in'] = user_ids
+    if ingredient_ids is not None:
+        lookups['ingredient__in'] = ingredient_ids
+    return RecipeIngredient.objects.filter(**lookups).values_list(
+        'recipe__in_cart__user', 'ingredient'
+    ).annotate(
+        total=Sum('amount'),
+        recipe_count=Count('recipe', distinct=True),
+    ).order_by('recipe__in_cart__user', 'ingredient')
+
+
+@transaction.atomic
+def refresh_totals(user_ids, ingredient_ids=None):
+    """Пересчитывает суммы пользователей по ингредиентам (или по всем)."""
+    # Пересчёты для одного пользователя идут по очереди: иначе два
+    # параллельных удалят одни и те же строки и оба вставят новые, и
+    # второй упадёт на уникальности. Блокировки берутся по порядку id,
+    # чтобы пересчёты для нескольких пользователей не ждали друг друга
+    # по кругу. В SQLite транзакции и так идут по очереди.
+    users = User.objects.select_for_update().filter(pk__in=user_ids)
+    list(users.order_by('pk').values_list('pk', flat=True))
+    items = ShoppingListItem.objects.filter(user__in=user_ids)
+    if ingredient_ids is not None:
+        items = items.filter(ingredient__in=ingredient_ids)
+    items.delete()
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(
+            user_id=user_id,
+            ingredient_id=ingredient_id,
+            amount=amount,
+            recipe_count=recipe_count,
+        )
+        for user_id, ingredient_id, amount, recipe_count in compute_totals(
+            user_ids, ingredient_ids
+        )
+    )
+
+
+def recipe_ingredient_ids(recipe_id):
+    return RecipeIngredient.objects.filter(
+        recipe_id=recipe_id
+    ).values('ingredient_id')
+
+
+def refresh_recipe_totals(recipe_id, ingredient_ids):
+    """Пересчёт у всех, чья корзина содержит рецепт recipe_id."""
+    user_ids = list(
+        ShoppingCart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True)
+    )
+    if user_ids:
+        refresh_totals(user_ids, ingredient_ids)
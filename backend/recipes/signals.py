@@ -0,0 +1,112 @@
+"""Обновление производных данных при изменении связанных моделей.
+
+Recipe.updated_at: по нему строится ключ кэша карточки рецепта, поэтому
+он должен меняться и тогда, когда меняются автор, ингредиенты или их
+названия. ShoppingListItem: суммы списков покупок пересчитываются при
+изменении корзины и состава рецептов в ней. FeedEntry: ленты подписок
+пополняются новыми рецептами и подписками (см. recipes.feed). Счётчики
+рецептов и пользователей меняются вместе со связями (см. recipes.counters).
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from users.models import Subscription
+
+from . import feed
+from .counters import COUNTERS, link_created, link_deleted
+from .models import Ingredient, Recipe, RecipeIngredient, ShoppingCart
+from .shopping import (
+    recipe_ingredient_ids,
+    refresh_recipe_totals,
+    refresh_totals,
+)
+
+User = get_user_model()
+
+
+def touch_recipes(queryset):
+    queryset.update(updated_at=timezone.now())
+
+
+def recipe_ingredient_changed(sender, instance, origin=None, **kwargs):
+    # При каскадном удалении рецепта или автора обновлять нечего.
+    origin_model = getattr(origin, 'model', type(origin))
+    if origin_model in (Recipe, User):
+        return
+    touch_recipes(Recipe.objects.filter(pk=instance.recipe_id))
+    # Суммы по удаляемому ингредиенту удалятся каскадом.
+    if origin_model is not Ingredient:
+        refresh_recipe_totals(instance.recipe_id, [instance.ingredient_id])
+
+
+def cart_saved(sender, instance, created=False, **kwargs):
+    if created:
+        refresh_totals(
+            [instance.user_id], recipe_ingredient_ids(instance.recipe_id)
+        )
+    else:
+        refresh_totals([instance.user_id])
+
+
+def cart_deleted(sender, instance, origin=None, **kwargs):
+    origin_model = getattr(origin, 'model', type(origin))
+    if origin_model is ShoppingCart:
+        refresh_totals(
+            [instance.user_id], recipe_ingredient_ids(instance.recipe_id)
+        )
+    elif not (
+        origin_model is User
+        and getattr(origin, 'pk', None) == instance.user_id
+    ):
+        # Каскад от рецепта или его автора: состав рецепта удаляется
+        # вместе с ним, поэтому корзину пересчитываем после удаления.
+        user_id = instance.user_id
+        transaction.on_commit(lambda: refresh_totals([user_id]))
+
+
+def recipe_created(sender, instance, created=False, **kwargs):
+    if created:
+        recipe_id, author_id = instance.pk, instance.author_id
+        transaction.on_commit(lambda: feed.fan_out(recipe_id, author_id))
+
+
+def subscription_created(sender, instance, created=False, **kwargs):
+    if created:
+        feed.backfill(instance.subscriber_id, instance.author_id)
+
+
+def subscription_deleted(sender, instance, origin=None, **kwargs):
+    # При удалении пользователя записи лент удалятся каскадом.
+    if getattr(origin, 'model', type(origin)) is not User:
+        feed.drop(instance.subscriber_id, instance.author_id)
+
+
+def ingredient_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_recipes(Recipe.objects.filter(components__ingredient=instance))
+
+
+def author_changed(sender, instance, created=False, update_fields=None,
+                   **kwargs):
+    if created or (
+        update_fields is not None and set(update_fields) == {'last_login'}
+    ):
+        return
+    touch_recipes(Recipe.objects.filter(author=instance))
+
+
+def connect_signals():
+    post_save.connect(recipe_ingredient_changed, sender=RecipeIngredient)
+    post_delete.connect(recipe_ingredient_changed, sender=RecipeIngredient)
+    post_save.connect(cart_saved, sender=ShoppingCart)
+    post_delete.connect(cart_deleted, sender=ShoppingCart)
+    post_save.connect(recipe_created, sender=Recipe)
+    post_save.connect(subscription_created, sender=Subscription)
+    post_delete.connect(subscription_deleted, sender=Subscription)
+    post_save.connect(ingredient_changed, sender=Ingredient)
+    post_save.connect(author_changed, sender=User)
+    for source in {source for _, _, source, _ in COUNTERS}:
+        post_save.connect(link_created, sender=source)
+        post_delete.connect(link_deleted, sender=source)
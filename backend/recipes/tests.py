@@ -0,0 +1,345 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from users.models import Subscription
+from utils.testing import AdminChangelistQueriesMixin
+
+from .models import (
+    Favorite,
+    FeedEntry,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingListItem,
+)
+
+User = get_user_model()
+
+
+class AdminChangelistQueriesTest(AdminChangelistQueriesMixin, TestCase):
+
+    changelist_models = (Recipe, Favorite, ShoppingCart, RecipeIngredient)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin',
+            first_name='Админ', last_name='Админов', password='pass12345!'
+        )
+        users = [
+            User.objects.create_user(
+                email=f'user{i}@example.com', username=f'user{i}',
+                first_name='Пользователь', last_name=str(i),
+                password='pass12345!'
+            )
+            for i in range(5)
+        ]
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {i}', measurement_unit='г')
+            for i in range(10)
+        )
+        for i in range(30):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {i}', text='Описание', cooking_time=10,
+                image='recipes/images/recipe.png', author=users[i % 5],
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=i + 1
+                )
+                for ingredient in ingredients[i % 7:i % 7 + 3]
+            )
+            Favorite.objects.create(user=users[i % 5], recipe=recipe)
+            ShoppingCart.objects.create(user=users[i % 3], recipe=recipe)
+
+
+class CounterFieldsSaveTest(TestCase):
+    """Полное сохранение устаревшего экземпляра не затирает счётчики."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader = (
+            User.objects.create_user(
+                email=f'{name}@example.com', username=name,
+                first_name='Имя', last_name='Фамилия', password='pass12345!'
+            )
+            for name in ('author', 'reader')
+        )
+        cls.recipe = Recipe.objects.create(
+            name='Рецепт', text='Описание', cooking_time=10,
+            image='recipes/images/recipe.png', author=cls.author,
+        )
+
+    def test_full_save_keeps_counters(self):
+        author = User.objects.get(pk=self.author.pk)
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        Subscription.objects.create(subscriber=self.reader, author=author)
+        Favorite.objects.create(user=self.reader, recipe=recipe)
+        author.first_name = 'Новое имя'
+        author.save()
+        recipe.name = 'Новое название'
+        recipe.save()
+        author.refresh_from_db()
+        recipe.refresh_from_db()
+        self.assertEqual(author.first_name, 'Новое имя')
+        self.assertEqual(author.recipes_count, 1)
+        self.assertEqual(author.subscribers_count, 1)
+        self.assertEqual(recipe.name, 'Новое название')
+        self.assertEqual(recipe.favorites_count, 1)
+
+    def test_counters_saved_when_requested(self):
+        self.recipe.favorites_count = 5
+        self.recipe.save(update_fields=['favorites_count'])
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 5)
+
+
+class ShoppingListTotalsTest(TestCase):
+    """Суммы списка покупок следуют за корзиной и составом рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.user = (
+            User.objects.create_user(
+                email=f'{name}@example.com', username=name,
+                first_name='Имя', last_name='Фамилия', password='pass12345!'
+            )
+            for name in ('author', 'user')
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {i}', measurement_unit='г')
+            for i in range(4)
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                name=f'Рецепт {i}', text='Описание', cooking_time=10,
+                image='recipes/images/recipe.png', author=cls.author,
+            )
+            for i in range(2)
+        ]
+        for recipe, ingredient, amount in (
+            (0, 0, 10), (0, 1, 20), (1, 1, 5), (1, 2, 7),
+        ):
+            RecipeIngredient.objects.create(
+                recipe=cls.recipes[recipe],
+                ingredient=cls.ingredients[ingredient], amount=amount,
+            )
+
+    def assert_totals(self, expected):
+        """expected: {номер ингредиента: (сумма, число рецептов)}."""
+        stored = {
+            item.ingredient_id: (item.amount, item.recipe_count)
+            for item in ShoppingListItem.objects.filter(user=self.user)
+        }
+        self.assertEqual(stored, {
+            self.ingredients[index].id: totals
+            for index, totals in expected.items()
+        })
+
+    def test_cart_changes(self):
+        for recipe in self.recipes:
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        self.assert_totals({0: (10, 1), 1: (25, 2), 2: (7, 1)})
+        ShoppingCart.objects.filter(
+            user=self.user, recipe=self.recipes[0]
+        ).delete()
+        self.assert_totals({1: (5, 1), 2: (7, 1)})
+
+    def test_ingredient_changes(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[1])
+        component = RecipeIngredient.objects.get(
+            recipe=self.recipes[1], ingredient=self.ingredients[1]
+        )
+        component.amount = 50
+        component.save()
+        self.assert_totals({1: (50, 1), 2: (7, 1)})
+        RecipeIngredient.objects.create(
+            recipe=self.recipes[1], ingredient=self.ingredients[3], amount=1
+        )
+        self.assert_totals({1: (50, 1), 2: (7, 1), 3: (1, 1)})
+        component.delete()
+        self.assert_totals({2: (7, 1), 3: (1, 1)})
+        self.ingredients[3].delete()
+        self.assert_totals({2: (7, 1)})
+
+    def test_recipe_update_through_api(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[0])
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.patch(
+            f'/api/recipes/{self.recipes[0].id}/',
+            {'ingredients': [
+                {'id': self.ingredients[0].id, 'amount': 3},
+                {'id': self.ingredients[2].id, 'amount': 4},
+            ]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_totals({0: (3, 1), 2: (4, 1)})
+
+    def test_recipe_deleted(self):
+        for recipe in self.recipes:
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[0].delete()
+        self.assert_totals({1: (5, 1), 2: (7, 1)})
+
+    def test_reconcile_repairs_drift(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[0])
+        ShoppingListItem.objects.filter(
+            ingredient=self.ingredients[0]
+        ).update(amount=999)
+        ShoppingListItem.objects.filter(
+            ingredient=self.ingredients[1]
+        ).delete()
+        call_command('reconcile_shopping_lists', stdout=StringIO())
+        self.assert_totals({0: (10, 1), 1: (20, 1)})
+
+
+class FeedTest(TestCase):
+    """Лента подписок после подписки, отписки и нового рецепта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.other, cls.reader = (
+            User.objects.create_user(
+                email=f'{name}@example.com', username=name,
+                first_name='Имя', last_name='Фамилия', password='pass12345!'
+            )
+            for name in ('author', 'other', 'reader')
+        )
+        cls.recipes = [
+            cls.create_recipe(author)
+            for author in (cls.author, cls.author, cls.other, cls.author)
+        ]
+
+    @classmethod
+    def create_recipe(cls, author):
+        return Recipe.objects.create(
+            name='Рецепт', text='Описание', cooking_time=10,
+            image='recipes/images/recipe.png', author=author,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def feed(self):
+        response = self.client.get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def author_recipes(self):
+        return [
+            recipe.id for recipe in reversed(self.recipes)
+            if recipe.author == self.author
+        ]
+
+    def test_subscribe_and_unsubscribe(self):
+        self.assertEqual(self.feed(), [])
+        url = f'/api/users/{self.author.id}/subscribe/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.feed(), self.author_recipes())
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.feed(), [])
+
+    def test_new_recipe(self):
+        Subscription.objects.create(subscriber=self.reader, author=self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes.append(self.create_recipe(self.author))
+            self.create_recipe(self.other)
+        self.assertEqual(self.feed(), self.author_recipes())
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, recipe=self.recipes[-1]
+        ).exists())
+
+    def test_large_author_read_on_demand(self):
+        Subscription.objects.create(subscriber=self.reader, author=self.author)
+        with mock.patch('recipes.feed.FEED_FANOUT_MAX_FOLLOWERS', 0):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.recipes.append(self.create_recipe(self.author))
+            self.assertFalse(FeedEntry.objects.filter(
+                recipe=self.recipes[-1]
+            ).exists())
+            self.assertEqual(self.feed(), self.author_recipes())
+
+    def test_prune_feeds(self):
+        for reader in (self.reader, self.other):
+            Subscription.objects.create(subscriber=reader, author=self.author)
+        with mock.patch('recipes.feed.FEED_MAX_SIZE', 2):
+            # Новые рецепты попадают в ленты без обрезки.
+            with self.captureOnCommitCallbacks(execute=True):
+                for _ in range(2):
+                    self.recipes.append(self.create_recipe(self.author))
+            self.assertEqual(len(self.feed()), 5)
+            out = StringIO()
+            call_command('prune_feeds', batch_size=1, stdout=out)
+        self.assertIn('Удалено записей лент: 6', out.getvalue())
+        self.assertEqual(self.feed(), self.author_recipes()[:2])
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.other).count(), 2
+        )
+
+
+class SeedCommandTest(TestCase):
+    """Загрузка ингредиентов из JSON потоком."""
+
+    def setUp(self):
+        self.directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        # Крошечные куски: элементы попадают на границы кусков.
+        self.enterContext(mock.patch(
+            'utils.management.commands.seed.JSON_CHUNK_SIZE', 8
+        ))
+
+    def seed(self, content, *args):
+        path = self.directory / 'ingredients.json'
+        path.write_text(content, encoding='utf-8')
+        out = StringIO()
+        call_command('seed', str(path), *args, stdout=out)
+        return out.getvalue()
+
+    def test_json(self):
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+        items = [
+            {'name': 'соль', 'measurement_unit': 'г'},
+            {'name': 'сахар', 'measurement_unit': 'г'},
+            {'name': 'молоко', 'measurement_unit': 'мл'},
+            {'name': 'сахар', 'measurement_unit': 'г'},
+            {'name': '', 'measurement_unit': 'г'},
+            'не объект',
+        ]
+        out = self.seed(
+            json.dumps(items, ensure_ascii=False, indent=2),
+            '--batch-size', '2',
+        )
+        self.assertIn('Добавлено: 2, пропущено: 2, с ошибками: 2', out)
+        self.assertEqual(
+            set(Ingredient.objects.values_list('name', flat=True)),
+            {'соль', 'сахар', 'молоко'},
+        )
+
+    def test_empty_array(self):
+        self.assertIn('Добавлено: 0', self.seed(' [ ] '))
+
+    def test_invalid_json(self):
+        for content in (
+            '{"name": "соль"}',
+            '[{"name": "соль", "measurement_unit": "г"}',
+            '[{"name": "соль"} {"name": "сахар"}]',
+            '[{"name": "соль", "measurement_unit": }]',
+        ):
+            with self.subTest(content=content):
+                with self.assertRaises(CommandError):
+                    self.seed(content)
+        self.assertFalse(Ingredient.objects.exists())
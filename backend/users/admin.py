@@ -1,20 +1,27 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
+from utils.admin import LargeTableAdminMixin
+
 from .models import (
     Subscription, User
 )
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
-    list_display = ('id', 'email', 'username', 'first_name', 'last_name')
+class UserAdmin(LargeTableAdminMixin, BaseUserAdmin):
+    list_display = (
+        'id', 'email', 'username', 'first_name', 'last_name',
+        'recipes_count', 'subscribers_count', 'subscriptions_count',
+    )
     search_fields = ('email', 'username', 'first_name', 'last_name')
     ordering = ('id',)
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'author__username', 'subscriber__username')
+    list_select_related = ('author', 'subscriber')
     search_fields = ('author__username', 'subscriber__username')
+    autocomplete_fields = ('author', 'subscriber')
     ordering = ('id',)
@@ -3,8 +3,11 @@ from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 
+from utils.models import CounterFieldsMixin
+from utils.storage import content_storage
 
-class User(AbstractUser):
+
+class User(CounterFieldsMixin, AbstractUser):
     username = models.CharField(
         'Имя пользователя',
         max_length=150,
@@ -23,6 +26,7 @@ class User(AbstractUser):
     avatar = models.ImageField(
         'Аватар',
         upload_to='avatars/',
+        storage=content_storage,
         default=''
     )
     first_name = models.CharField(
@@ -33,6 +37,26 @@ class User(AbstractUser):
         'Фамилия',
         max_length=150,
     )
+    # Счётчики поддерживает recipes.counters.
+    recipes_count = models.PositiveIntegerField(
+        'Число рецептов',
+        default=0,
+        editable=False,
+    )
+    subscribers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0,
+        editable=False,
+    )
+    subscriptions_count = models.PositiveIntegerField(
+        'Число подписок',
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = (
+        'recipes_count', 'subscribers_count', 'subscriptions_count',
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = [
@@ -0,0 +1,30 @@
+from django.test import TestCase
+
+from utils.testing import AdminChangelistQueriesMixin
+
+from .models import Subscription, User
+
+
+class AdminChangelistQueriesTest(AdminChangelistQueriesMixin, TestCase):
+
+    changelist_models = (User, Subscription)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin',
+            first_name='Админ', last_name='Админов', password='pass12345!'
+        )
+        users = [
+            User.objects.create_user(
+                email=f'user{i}@example.com', username=f'user{i}',
+                first_name='Пользователь', last_name=str(i),
+                password='pass12345!'
+            )
+            for i in range(30)
+        ]
+        for i, subscriber in enumerate(users):
+            for author in users[i + 1:i + 4]:
+                Subscription.objects.create(
+                    subscriber=subscriber, author=author
+                )
@@ -0,0 +1,36 @@
+from django.db import connections
+from django.utils.functional import cached_property
+
+from api.pagination import CachedCountPaginator
+from utils.constants import ADMIN_COUNT_ESTIMATE_THRESHOLD
+
+
+class EstimatedCountPaginator(CachedCountPaginator):
+    """Пагинатор админки: для больших таблиц без фильтров — оценка.
+
+    В PostgreSQL число строк берётся из pg_class.reltuples, которое
+    обновляет ANALYZE, вместо полного COUNT(*).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class '
+                    'WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table],
+                )
+                estimate = cursor.fetchone()[0]
+            if estimate >= ADMIN_COUNT_ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class LargeTableAdminMixin:
+    """Список без полного COUNT(*) и с оценкой размера больших таблиц."""
+
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
@@ -6,4 +6,60 @@ MAX_COOKING_TIME = 32000
 
 # Минимальное и максимальное количество ингредиентов в рецепте
 MIN_INGREDIENT_AMOUNT = 1
-MAX_INGREDIENT_AMOUNT = 32000
\ No newline at end of file
+MAX_INGREDIENT_AMOUNT = 32000
+
+# Кэширование COUNT(*) в пагинации: с какого размера выборки и на сколько
+# секунд
+PAGINATION_COUNT_CACHE_THRESHOLD = 1000
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+
+# Кэш связей пользователя (избранное, корзина, подписки): максимальный
+# размер множества и время жизни в секундах
+RELATIONS_CACHE_MAX_SIZE = 1000
+RELATIONS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Время (в секундах), на которое шлюз и браузер могут переиспользовать
+# ответы анонимным пользователям
+ANONYMOUS_CACHE_MAX_AGE = 60
+
+# Время жизни (в секундах) закэшированной карточки рецепта
+RECIPE_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Минимальная доля триграмм запроса, найденных в названии ингредиента,
+# при поиске с опечатками
+FUZZY_SEARCH_THRESHOLD = 0.5
+
+# Загрузка изображений через /api/uploads/: каталог в хранилище,
+# максимальный размер файла в байтах и время жизни ссылки в секундах
+UPLOAD_DIR = 'uploads'
+UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+UPLOAD_MAX_AGE = 60 * 60 * 24
+
+# Производные изображений рецептов и аватаров: ширины в пикселях,
+# качество сжатия и число фоновых потоков на воркер
+IMAGE_VARIANT_WIDTHS = (160, 320, 640)
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_WORKERS = 2
+
+# Лента подписок: сколько рецептов хранится в ленте пользователя и
+# с какого числа подписчиков рецепты автора не раскладываются по лентам,
+# а подмешиваются при чтении
+FEED_MAX_SIZE = 500
+FEED_FANOUT_MAX_FOLLOWERS = 1000
+
+# Админка: с какого числа строк в таблице число строк в списке без
+# фильтров берётся из статистики PostgreSQL, а не из COUNT(*)
+ADMIN_COUNT_ESTIMATE_THRESHOLD = 100_000
+
+# Время жизни (в секундах) записей кэша аутентификации: токен и
+# пользователь
+AUTH_CACHE_TIMEOUT = 60 * 15
+
+# Короткие ссылки: сколько id существующих рецептов помнит воркер и на
+# сколько секунд шлюз и браузер могут кэшировать редирект
+SHORT_LINK_KNOWN_IDS_MAX_SIZE = 100_000
+SHORT_LINK_CACHE_MAX_AGE = 60 * 10
+
+# Лимит (в миллисекундах) на один SQL-запрос при обслуживании API под
+# PostgreSQL; management-команды работают без лимита
+API_STATEMENT_TIMEOUT = 5000
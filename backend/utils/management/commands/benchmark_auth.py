@@ -0,0 +1,73 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.authentication import (
+    CachedTokenAuthentication,
+    StatelessJWTAuthentication,
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает аутентификацию запроса: TokenAuthentication DRF, '
+        'токен с кэшем и JWT без базы — запросы к базе и время на запрос.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', help='Email пользователя; по умолчанию первый.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=1000,
+            help='Сколько запросов аутентифицировать каждым способом.'
+        )
+
+    def handle(self, *args, user, repeat, **options):
+        users = User.objects.order_by('id')
+        user = users.filter(email=user).first() if user else users.first()
+        if user is None:
+            raise CommandError('Нет пользователя для запросов.')
+        token, _ = Token.objects.get_or_create(user=user)
+        jwt = AccessToken.for_user(user)
+        factory = APIRequestFactory()
+        modes = (
+            ('TokenAuthentication', TokenAuthentication(), f'Token {token}'),
+            (
+                'CachedTokenAuthentication', CachedTokenAuthentication(),
+                f'Token {token}',
+            ),
+            (
+                'StatelessJWTAuthentication', StatelessJWTAuthentication(),
+                f'Bearer {jwt}',
+            ),
+        )
+        for label, authentication, header in modes:
+            # Первый запрос заполняет кэш, как у уже вошедшего пользователя.
+            authentication.authenticate(
+                Request(factory.get('/', HTTP_AUTHORIZATION=header))
+            )
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    request = Request(
+                        factory.get('/', HTTP_AUTHORIZATION=header)
+                    )
+                    authenticated, _ = authentication.authenticate(request)
+                    # view обычно нужен только id пользователя.
+                    authenticated.pk
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{label}: {len(queries) / repeat:.2f} запроса к базе, '
+                f'{elapsed / repeat * 1_000_000:.0f} мкс на запрос'
+            )
@@ -0,0 +1,80 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from recipes.models import Recipe
+
+
+def server_sessions(monitor):
+    """Сессии, открытые к базе за всё время, по статистике PostgreSQL."""
+    with monitor.cursor() as cursor:
+        cursor.execute('SELECT pg_stat_clear_snapshot()')
+        cursor.execute(
+            'SELECT sessions FROM pg_stat_database '
+            'WHERE datname = current_database()'
+        )
+        return cursor.fetchone()[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Цикл запроса Django (request_started, один SQL-запрос, '
+        'request_finished) с текущими настройками соединений: '
+        'DB_CONNECTION_MODE, DB_CONN_MAX_AGE. Показывает время на запрос '
+        'и число открытых соединений.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=2000,
+            help='Сколько запросов выполнить.'
+        )
+
+    def handle(self, *args, repeat, **options):
+        settings = connection.settings_dict
+        pool = settings['OPTIONS'].get('pool')
+        self.stdout.write(
+            f'{connection.vendor}: CONN_MAX_AGE={settings["CONN_MAX_AGE"]}'
+            f'{", пул " + str(pool) if pool else ""}'
+        )
+        monitor = None
+        if connection.vendor == 'postgresql':
+            # Отдельное соединение не зависит от режима и пула Django.
+            from django.db.backends.postgresql.base import Database
+
+            monitor = Database.connect(
+                **connection.get_connection_params(), autocommit=True
+            )
+            before = server_sessions(monitor)
+        opened = []
+
+        def count(sender, **kwargs):
+            opened.append(sender)
+
+        connection_created.connect(count)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            request_started.send(sender=self.__class__)
+            try:
+                # Как у редиректа по короткой ссылке на несуществующий
+                # рецепт: один лёгкий запрос.
+                Recipe.objects.filter(pk=0).exists()
+            finally:
+                request_finished.send(sender=self.__class__)
+        elapsed = time.perf_counter() - started
+        connection_created.disconnect(count)
+        self.stdout.write(
+            f'{elapsed / repeat * 1000:.3f} мс на запрос, '
+            f'открытий соединения в Django: {len(opened)}'
+        )
+        if monitor is not None:
+            # Завершившиеся сессии попадают в статистику не сразу.
+            time.sleep(1)
+            self.stdout.write(
+                'Новых сессий PostgreSQL: '
+                f'{server_sessions(monitor) - before}'
+            )
+            monitor.close()
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.search import get_ingredient_index
+from recipes.models import Ingredient
+
+PREFIXES = ('а', 'к', 'мо', 'сол', 'Сыр', 'ябл', 'ё', 'шоколад', 'xyz')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает автодополнение ингредиентов по индексу в памяти '
+        '(api.search) с запросом name__istartswith к базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'prefixes', nargs='*', default=PREFIXES,
+            help='Начала названий.'
+        )
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument(
+            '--repeat', type=int, default=200,
+            help='Сколько раз повторять каждый поиск.'
+        )
+
+    def handle(self, *args, prefixes, limit, repeat, **options):
+        index = get_ingredient_index()
+
+        def from_index(prefix):
+            return index.startswith(prefix, limit)
+
+        def from_database(prefix):
+            return list(Ingredient.objects.filter(
+                name__istartswith=prefix
+            ).order_by('name').values(
+                'id', 'name', 'measurement_unit'
+            )[:limit])
+
+        self.stdout.write(
+            f'Ингредиентов: {len(index.keys)}, limit={limit}, '
+            f'мкс на поиск (индекс / база):'
+        )
+        for prefix in prefixes:
+            timings = []
+            for search in (from_index, from_database):
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    found = search(prefix)
+                timings.append(
+                    (time.perf_counter() - started) / repeat * 1_000_000
+                )
+            self.stdout.write(
+                f'  {prefix!r}: {timings[0]:.1f} / {timings[1]:.1f} '
+                f'(найдено индексом: {len(from_index(prefix))}, '
+                f'базой: {len(found)})'
+            )
@@ -0,0 +1,135 @@
+import time
+from statistics import median
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef
+from django.test.utils import override_settings
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from recipes.models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+
+class BaselineUserSerializer(serializers.ModelSerializer):
+    is_subscribed = serializers.BooleanField(source='author_is_subscribed')
+
+    class Meta:
+        model = User
+        fields = [
+            'email', 'id', 'avatar', 'username', 'first_name', 'last_name',
+            'is_subscribed',
+        ]
+
+
+class BaselineIngredientSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ['id', 'name', 'measurement_unit', 'amount']
+
+
+class BaselineRecipeSerializer(serializers.ModelSerializer):
+    author = serializers.SerializerMethodField()
+    ingredients = BaselineIngredientSerializer(
+        source='components', many=True
+    )
+    is_favorited = serializers.BooleanField()
+    is_in_shopping_cart = serializers.BooleanField()
+
+    class Meta:
+        model = Recipe
+        fields = [
+            'id', 'author', 'ingredients',
+            'is_favorited', 'is_in_shopping_cart',
+            'name', 'image', 'text', 'cooking_time',
+        ]
+
+    def get_author(self, obj):
+        obj.author.author_is_subscribed = obj.author_is_subscribed
+        return BaselineUserSerializer(obj.author, context=self.context).data
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время процессора на страницу списка рецептов: выдача '
+        'API из строк values() (api.rows) с холодным и тёплым кэшем '
+        'карточек против вложенных ModelSerializer по тому же запросу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=100,
+            help='Размер страницы.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз повторять каждый замер.'
+        )
+        parser.add_argument(
+            '--user', help='Email пользователя; по умолчанию первый.'
+        )
+
+    def handle(self, *args, limit, repeat, user, **options):
+        users = User.objects.order_by('id')
+        user = users.filter(email=user).first() if user else users.first()
+        if user is None:
+            raise CommandError('Нет пользователя для запросов.')
+        client = APIClient()
+        client.force_authenticate(user)
+        url = f'/api/recipes/?limit={limit}'
+
+        def cold():
+            cache.clear()
+            client.get(url)
+
+        def warm():
+            client.get(url)
+
+        request = APIRequestFactory().get(url)
+        request.user = user
+
+        def baseline():
+            recipes = Recipe.objects.select_related('author').prefetch_related(
+                'components__ingredient'
+            ).annotate(
+                author_is_subscribed=Exists(Subscription.objects.filter(
+                    author=OuterRef('author'), subscriber=user
+                )),
+                is_favorited=Exists(Favorite.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )),
+                is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )),
+            )[:limit]
+            JSONRenderer().render(BaselineRecipeSerializer(
+                recipes, many=True, context={'request': request}
+            ).data)
+
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            warm()
+            for label, run in (
+                ('ModelSerializer', baseline),
+                ('api.rows, холодный кэш', cold),
+                ('api.rows, тёплый кэш', warm),
+            ):
+                timings = []
+                for _ in range(repeat):
+                    started = time.process_time()
+                    run()
+                    timings.append(time.process_time() - started)
+                self.stdout.write(
+                    f'{label}: {median(timings) * 1000:.1f} мс процессора '
+                    f'на страницу из {limit}'
+                )
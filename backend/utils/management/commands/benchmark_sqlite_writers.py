@@ -0,0 +1,113 @@
+import multiprocessing
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+User = get_user_model()
+
+
+def write(user_id, recipe_ids, duration, results):
+    """Процесс-писатель: добавление и удаление избранного и покупок."""
+    writes = locked = step = 0
+    finish = time.monotonic() + duration
+    while time.monotonic() < finish:
+        recipe_id = recipe_ids[step % len(recipe_ids)]
+        step += 1
+        for model in (Favorite, ShoppingCart):
+            relation = model.objects.filter(
+                user_id=user_id, recipe_id=recipe_id
+            )
+            try:
+                # Как во view: проверка и запись в одной транзакции.
+                with transaction.atomic():
+                    if not relation.exists():
+                        model.objects.create(
+                            user_id=user_id, recipe_id=recipe_id
+                        )
+                with transaction.atomic():
+                    relation.delete()
+                writes += 2
+            except OperationalError:
+                locked += 1
+    connection.close()
+    results.put((writes, locked))
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузка записью на SQLite: N процессов добавляют и удаляют '
+        'избранное и покупки, как view. Показывает записи в секунду и '
+        'ошибки «database is locked»; --plain — без настроек SQLite из '
+        'settings (режим журнала DELETE, BEGIN DEFERRED, timeout 5 с).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'writers', nargs='*', type=int, default=[1, 4, 16],
+            help='Число процессов-писателей для каждого прогона.'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Длительность прогона в секундах.'
+        )
+        parser.add_argument(
+            '--plain', action='store_true',
+            help='Настройки SQLite по умолчанию Django для сравнения.'
+        )
+
+    def handle(self, *args, writers, duration, plain, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда проверяет только SQLite.')
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True)[:100])
+        if not recipe_ids:
+            raise CommandError('Нет рецептов: выполните команду seed.')
+        users = User.objects.bulk_create(
+            User(
+                email=f'sqlite-writer-{i}@example.com',
+                username=f'sqlite-writer-{i}',
+                first_name='Писатель', last_name=str(i),
+            )
+            for i in range(max(writers))
+        )
+        settings_options = connection.settings_dict['OPTIONS']
+        try:
+            if plain:
+                connection.settings_dict['OPTIONS'] = {}
+                connection.close()
+                with connection.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode=DELETE')
+            for count in writers:
+                self.run(users[:count], recipe_ids, duration)
+        finally:
+            # Новое соединение снова включит WAL из init_command.
+            connection.close()
+            connection.settings_dict['OPTIONS'] = settings_options
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    def run(self, users, recipe_ids, duration):
+        # Дочерние процессы открывают свои соединения.
+        connection.close()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=write, args=(user.pk, recipe_ids, duration, results)
+            )
+            for user in users
+        ]
+        started = time.monotonic()
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'Писателей: {len(users)}, записей в секунду: '
+            f'{sum(writes for writes, _ in totals) / elapsed:.0f}, '
+            f'ошибок блокировки: {sum(locked for _, locked in totals)}'
+        )
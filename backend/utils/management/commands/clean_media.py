@@ -0,0 +1,114 @@
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.images import IMAGE_FIELDS, variant_names, variants_key
+from utils.constants import UPLOAD_DIR, UPLOAD_MAX_AGE
+
+
+def walk(storage, path):
+    """Имена файлов каталога и его подкаталогов, без чтения всего дерева."""
+    try:
+        directories, files = storage.listdir(path)
+    except FileNotFoundError:
+        return
+    for file in sorted(files):
+        yield f'{path}/{file}'
+    for directory in sorted(directories):
+        yield from walk(storage, f'{path}/{directory}')
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет файлы изображений, на которые не ссылается ни один '
+        'рецепт или пользователь, их уменьшенные копии и просроченные '
+        'загрузки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=60 * 60,
+            help='Не трогать файлы моложе стольких секунд.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько имён проверять одним запросом.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено.'
+        )
+
+    def handle(self, *args, min_age, batch_size, dry_run, verbosity,
+               **options):
+        started = time.perf_counter()
+        self.dry_run = dry_run
+        self.verbosity = verbosity
+        self.counts = {'checked': 0, 'deleted': 0, 'bytes': 0}
+        now = timezone.now()
+
+        for model, field_name in IMAGE_FIELDS.items():
+            field = model._meta.get_field(field_name)
+            files = self.old_files(
+                field.storage, field.upload_to.rstrip('/'),
+                now - timedelta(seconds=min_age)
+            )
+            for batch in batched(files, batch_size):
+                self.counts['checked'] += len(batch)
+                used = set(
+                    model.objects.filter(
+                        **{f'{field_name}__in': batch}
+                    ).values_list(field_name, flat=True)
+                )
+                for name in batch:
+                    if name not in used:
+                        self.delete(field.storage, name)
+                        for variant in variant_names(name):
+                            self.delete(default_storage, variant)
+                        if not dry_run:
+                            cache.delete(variants_key(name))
+
+        # Ссылка на загрузку живёт UPLOAD_MAX_AGE, после этого файл не нужен.
+        for name in self.old_files(
+            default_storage, UPLOAD_DIR,
+            now - timedelta(seconds=max(min_age, UPLOAD_MAX_AGE))
+        ):
+            self.counts['checked'] += 1
+            self.delete(default_storage, name)
+
+        elapsed = time.perf_counter() - started
+        prefix = '[dry-run] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}Проверено: {self.counts["checked"]}, '
+            f'удалено: {self.counts["deleted"]} '
+            f'({self.counts["bytes"] / 1024 / 1024:.1f} МБ) '
+            f'за {elapsed:.2f} с.'
+        ))
+
+    def old_files(self, storage, path, before):
+        for name in walk(storage, path):
+            if storage.get_modified_time(name) < before:
+                yield name
+
+    def delete(self, storage, name):
+        try:
+            size = storage.size(name)
+        except FileNotFoundError:
+            return
+        self.counts['deleted'] += 1
+        self.counts['bytes'] += size
+        if self.verbosity > 1:
+            self.stdout.write(name)
+        if not self.dry_run:
+            storage.delete(name)
@@ -0,0 +1,125 @@
+import asyncio
+import itertools
+import time
+from statistics import quantiles
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+async def read_response(reader):
+    """Статус ответа и признак закрытия соединения; тело читается."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    status_line, *lines = head.decode('latin-1').split('\r\n')
+    status = int(status_line.split()[1])
+    headers = {}
+    for line in lines:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip().lower()
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif status >= 200 and status not in (204, 304):
+        await reader.read()
+        return status, True
+    return status, headers.get('connection') == 'close'
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест: GET-запросы по кругу к списку путей с '
+        'заданным числом одновременных keep-alive соединений. Удобно '
+        'сравнивать WSGI- и ASGI-профиль одного и того же кода.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'url', help='Адрес сервера, например http://127.0.0.1:8000'
+        )
+        parser.add_argument('paths', nargs='+', help='Пути запросов.')
+        parser.add_argument(
+            '--connections', type=int, default=200,
+            help='Число одновременных соединений.'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=20,
+            help='Длительность теста в секундах.'
+        )
+        parser.add_argument(
+            '--header', action='append', default=[],
+            help='Дополнительный заголовок, например '
+                 '"Authorization: Token ...".'
+        )
+
+    def handle(self, *args, url, paths, connections, duration, header,
+               **options):
+        parts = urlsplit(url)
+        if parts.scheme != 'http' or not parts.hostname:
+            raise CommandError('Нужен адрес вида http://host:port.')
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.extra = ''.join(f'{line}\r\n' for line in header)
+        self.paths = itertools.cycle(paths)
+        self.latencies, self.statuses, self.errors = [], {}, 0
+        started = time.perf_counter()
+        asyncio.run(self.run(connections, started + duration))
+        elapsed = time.perf_counter() - started
+
+        total = len(self.latencies)
+        self.stdout.write(
+            f'Запросов: {total}, в секунду: {total / elapsed:.0f}, '
+            f'ошибок соединения: {self.errors}'
+        )
+        self.stdout.write('Статусы: ' + ', '.join(
+            f'{status}: {count}'
+            for status, count in sorted(self.statuses.items())
+        ))
+        if total > 1:
+            cuts = quantiles(self.latencies, n=100)
+            self.stdout.write(
+                'Задержка, мс: '
+                f'p50 {cuts[49] * 1000:.1f}, '
+                f'p95 {cuts[94] * 1000:.1f}, '
+                f'p99 {cuts[98] * 1000:.1f}, '
+                f'max {max(self.latencies) * 1000:.1f}'
+            )
+
+    async def run(self, connections, deadline):
+        await asyncio.gather(*(
+            self.worker(deadline) for _ in range(connections)
+        ))
+
+    async def worker(self, deadline):
+        writer = None
+        while time.perf_counter() < deadline:
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(
+                        self.host, self.port
+                    )
+                request = (
+                    f'GET {next(self.paths)} HTTP/1.1\r\n'
+                    f'Host: {self.host}:{self.port}\r\n'
+                    f'{self.extra}\r\n'
+                )
+                sent = time.perf_counter()
+                writer.write(request.encode())
+                status, closed = await read_response(reader)
+                self.latencies.append(time.perf_counter() - sent)
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+                if closed:
+                    writer.close()
+                    writer = None
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                self.errors += 1
+                if writer is not None:
+                    writer.close()
+                writer = None
+                await asyncio.sleep(0.01)
+        if writer is not None:
+            writer.close()
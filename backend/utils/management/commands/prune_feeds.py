@@ -0,0 +1,41 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from recipes.feed import prune
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Обрезает ленты подписок до FEED_MAX_SIZE последних рецептов. '
+        'Запускается по расписанию: при публикации рецепта ленты растут '
+        'без обрезки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько лент обрезать одним запросом.'
+        )
+
+    def handle(self, *args, batch_size, **options):
+        started = time.perf_counter()
+        total = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                User.objects.filter(
+                    pk__gt=last_pk
+                ).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            last_pk = pks[-1]
+            total += prune(pks)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей лент: {total} за {elapsed:.2f} с.'
+        ))
@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from recipes.counters import COUNTERS, counted
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики рецептов и пользователей по связям, '
+        'сообщает о расхождениях и исправляет их.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк проверять одним запросом.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только сообщить о расхождениях.'
+        )
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        started = time.perf_counter()
+        prefix = '[dry-run] ' if dry_run else ''
+        total = 0
+        for model, counter, source, field in COUNTERS:
+            drift = 0
+            last_pk = 0
+            while True:
+                # Пакет строк по возрастанию pk; в выборку попадают
+                # только строки, где счётчик разошёлся со связями.
+                pks = list(
+                    model.objects.filter(
+                        pk__gt=last_pk
+                    ).order_by('pk').values_list('pk', flat=True)[
+                        :batch_size
+                    ]
+                )
+                if not pks:
+                    break
+                last_pk = pks[-1]
+                wrong = list(
+                    model.objects.filter(pk__in=pks).annotate(
+                        actual=counted(source, field)
+                    ).exclude(**{counter: F('actual')}).values_list(
+                        'pk', flat=True
+                    )
+                )
+                drift += len(wrong)
+                if wrong and not dry_run:
+                    # Значение пересчитывается в самом UPDATE, чтобы не
+                    # затереть изменения, сделанные после проверки.
+                    model.objects.filter(pk__in=wrong).update(
+                        **{counter: counted(source, field)}
+                    )
+            total += drift
+            if drift:
+                self.stdout.write(self.style.WARNING(
+                    f'{prefix}{model._meta.label}.{counter}: '
+                    f'расхождений {drift}'
+                ))
+        elapsed = time.perf_counter() - started
+
+        style = self.style.WARNING if total else self.style.SUCCESS
+        self.stdout.write(style(
+            f'{prefix}Расхождений: {total} за {elapsed:.2f} с.'
+        ))
@@ -0,0 +1,98 @@
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import ShoppingListItem
+from recipes.shopping import compute_totals
+
+
+def merge(expected, stored):
+    """Сравнивает два упорядоченных по (user_id, ingredient_id) потока.
+
+    Возвращает пары (ожидаемая строка, сохранённая строка), где одна
+    из сторон может быть None, — только для расхождений.
+    """
+    expected, stored = iter(expected), iter(stored)
+    want, have = next(expected, None), next(stored, None)
+    while want is not None or have is not None:
+        want_key = want[:2] if want is not None else None
+        have_key = have[1:3] if have is not None else None
+        if have_key is None or (want_key is not None and want_key < have_key):
+            yield want, None
+            want = next(expected, None)
+        elif want_key is None or have_key < want_key:
+            yield None, have
+            have = next(stored, None)
+        else:
+            if want[2:] != have[3:]:
+                yield want, have
+            want, have = next(expected, None), next(stored, None)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет суммы списков покупок с корзинами, сообщает о '
+        'расхождениях и исправляет их.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько исправлений записывать за один запрос.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только сообщить о расхождениях.'
+        )
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        started = time.perf_counter()
+        counts = {'missing': 0, 'extra': 0, 'changed': 0}
+        stored = ShoppingListItem.objects.values_list(
+            'id', 'user_id', 'ingredient_id', 'amount', 'recipe_count'
+        ).order_by('user_id', 'ingredient_id')
+        with transaction.atomic():
+            # Потоки сравниваются без загрузки таблиц в память, а
+            # расхождения собираются заранее: писать в таблицу, пока
+            # открыт курсор по ней, в SQLite небезопасно.
+            drift = iter(list(merge(
+                compute_totals().iterator(), stored.iterator()
+            )))
+            while batch := list(islice(drift, batch_size)):
+                create, delete, update = [], [], []
+                for want, have in batch:
+                    if have is None:
+                        counts['missing'] += 1
+                        create.append(ShoppingListItem(
+                            user_id=want[0], ingredient_id=want[1],
+                            amount=want[2], recipe_count=want[3],
+                        ))
+                    elif want is None:
+                        counts['extra'] += 1
+                        delete.append(have[0])
+                    else:
+                        counts['changed'] += 1
+                        update.append(ShoppingListItem(
+                            pk=have[0], amount=want[2], recipe_count=want[3]
+                        ))
+                if dry_run:
+                    continue
+                ShoppingListItem.objects.bulk_create(create)
+                ShoppingListItem.objects.filter(pk__in=delete).delete()
+                ShoppingListItem.objects.bulk_update(
+                    update, ['amount', 'recipe_count']
+                )
+        elapsed = time.perf_counter() - started
+
+        prefix = '[dry-run] ' if dry_run else ''
+        style = self.style.WARNING if any(counts.values()) else (
+            self.style.SUCCESS
+        )
+        self.stdout.write(style(
+            f'{prefix}Не хватало: {counts["missing"]}, '
+            f'лишних: {counts["extra"]}, '
+            f'с другой суммой: {counts["changed"]} '
+            f'за {elapsed:.2f} с.'
+        ))
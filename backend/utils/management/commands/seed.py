@@ -1,15 +1,174 @@
 import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from api.versions import bump_version, model_version_key
 from recipes.models import Ingredient
 
+DEFAULT_PATH = settings.BASE_DIR / 'data' / 'ingredients.csv'
+NAME_MAX_LENGTH = Ingredient._meta.get_field('name').max_length
+UNIT_MAX_LENGTH = Ingredient._meta.get_field('measurement_unit').max_length
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as file:
+        for row in csv.reader(file):
+            yield row[:2]
+
+
+def _json_values(file):
+    """Элементы массива JSON по одному: файл читается кусками по
+    JSON_CHUNK_SIZE символов, в памяти — кусок и текущий элемент."""
+    decoder = json.JSONDecoder()
+    buffer, eof = '', False
+    # Что ожидается дальше: '[' — начало массива, 'item' — элемент или
+    # ']', ',' — запятая или ']'.
+    expected = '['
+    while True:
+        buffer = buffer.lstrip()
+        if not eof and len(buffer) < JSON_CHUNK_SIZE:
+            chunk = file.read(JSON_CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        if not buffer:
+            raise CommandError('JSON оборвался: массив не закрыт.')
+        if expected == '[':
+            if buffer[0] != '[':
+                raise CommandError('Ожидался массив JSON.')
+            buffer, expected = buffer[1:], 'item'
+        elif buffer[0] == ']':
+            return
+        elif expected == ',':
+            if buffer[0] != ',':
+                raise CommandError('Ожидалась запятая между элементами.')
+            buffer, expected = buffer[1:], 'item'
+        else:
+            try:
+                value, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError as error:
+                if eof:
+                    raise CommandError(f'Некорректный JSON: {error}')
+                # Элемент не поместился в буфер — дочитываем файл.
+                chunk = file.read(JSON_CHUNK_SIZE)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield value
+            buffer, expected = buffer[end:], ','
+
+
+def read_json(path):
+    with open(path, encoding='utf-8') as file:
+        for item in _json_values(file):
+            if not isinstance(item, dict):
+                item = {}
+            yield item.get('name'), item.get('measurement_unit')
+
+
+READERS = {'.csv': read_csv, '.json': read_json}
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
 
 class Command(BaseCommand):
-    def handle(self, *args, **options):
-        with open("ingredients.csv") as f:
-            reader = csv.reader(f)
-            for row in reader:
-                Ingredient.objects.update_or_create(
-                    name=row[0], measurement_unit=row[1]
-                )
+    help = (
+        'Загружает ингредиенты из CSV или JSON пачками. Оба формата '
+        'читаются потоком. Существующие ингредиенты пропускаются: '
+        'кроме названия и единицы измерения, по которым они ищутся, '
+        'обновлять у них нечего.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=DEFAULT_PATH, type=Path,
+            help=f'Файл .csv или .json (по умолчанию {DEFAULT_PATH}).'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк вставлять за один запрос.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, что будет загружено, без записи.'
+        )
+
+    def handle(self, *args, path, batch_size, dry_run, **options):
+        reader = READERS.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError(f'Неподдерживаемый формат файла: {path}')
+        if not path.exists():
+            raise CommandError(f'Файл не найден: {path}')
+
+        started = time.perf_counter()
+        counts = {'inserted': 0, 'skipped': 0, 'invalid': 0}
+        seen = set()
+        with transaction.atomic():
+            for batch in batched(reader(path), batch_size):
+                self.load_batch(batch, seen, counts, dry_run)
+            if counts['inserted'] and not dry_run:
+                # bulk_create не шлёт сигналов: сбрасываем версию вручную.
+                bump_version(model_version_key(Ingredient))
+        elapsed = time.perf_counter() - started
+
+        prefix = '[dry-run] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}Добавлено: {counts["inserted"]}, '
+            f'пропущено: {counts["skipped"]}, '
+            f'с ошибками: {counts["invalid"]} '
+            f'за {elapsed:.2f} с.'
+        ))
+
+    def load_batch(self, batch, seen, counts, dry_run):
+        """Вставляет новые ингредиенты пачки.
+
+        Уже существующие и повторяющиеся в файле строки пропускаются:
+        кроме ключа name + measurement_unit других полей у ингредиента
+        нет, поэтому обновлять при совпадении нечего.
+        """
+        keys = []
+        for row in batch:
+            name, unit = (list(row) + [None, None])[:2]
+            name = (name or '').strip()
+            unit = (unit or '').strip()
+            if (
+                not name or not unit
+                or len(name) > NAME_MAX_LENGTH
+                or len(unit) > UNIT_MAX_LENGTH
+            ):
+                counts['invalid'] += 1
+            elif (name, unit) in seen:
+                counts['skipped'] += 1
+            else:
+                seen.add((name, unit))
+                keys.append((name, unit))
+        if not keys:
+            return
+
+        existing = set(
+            Ingredient.objects.filter(
+                name__in={name for name, _ in keys}
+            ).values_list('name', 'measurement_unit')
+        )
+        new = [key for key in keys if key not in existing]
+        counts['skipped'] += len(keys) - len(new)
+        counts['inserted'] += len(new)
+        if not dry_run:
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=unit)
+                    for name, unit in new
+                ],
+                ignore_conflicts=True,
+            )
@@ -0,0 +1,26 @@
+class CounterFieldsMixin:
+    """Полное сохранение модели не затирает счётчики в её столбцах.
+
+    Поля counter_fields меняет только recipes.counters выражениями F().
+    save() без update_fields пропускает их, чтобы устаревший экземпляр
+    не записал обратно прочитанные когда-то значения. Явно указанные в
+    update_fields счётчики сохраняются как обычно.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not args
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
@@ -0,0 +1,43 @@
+"""Хранилище файлов, адресуемых по содержимому.
+
+Имя файла — SHA-256 его содержимого, разложенный по двум уровням
+подкаталогов, чтобы в одном каталоге не копились тысячи файлов.
+Одинаковые загрузки сохраняются один раз. Поэтому файл может быть
+общим у нескольких записей, и удалять его при замене или удалении
+записи нельзя — неиспользуемые файлы удаляет команда clean_media.
+"""
+from hashlib import sha256
+from pathlib import PurePosixPath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def hashed_name(self, name, content):
+        digest = sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        path = PurePosixPath(name)
+        digest = digest.hexdigest()
+        return str(
+            path.parent / digest[:2] / digest[2:4]
+            / f'{digest}{path.suffix.lower()}'
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+content_storage = ContentAddressedStorage()
@@ -0,0 +1,39 @@
+"""Общие части тестов приложений."""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Запросов на страницу списка в админке, сколько бы строк ни было.
+ADMIN_CHANGELIST_MAX_QUERIES = 5
+
+
+def admin_changelist_max_queries():
+    # В PostgreSQL пагинатор сначала читает оценку числа строк
+    # (см. utils.admin), поэтому там на один запрос больше.
+    return ADMIN_CHANGELIST_MAX_QUERIES + (
+        connection.vendor == 'postgresql'
+    )
+
+
+class AdminChangelistQueriesMixin:
+    """Списки моделей changelist_models в админке укладываются в
+    admin_changelist_max_queries() запросов. Нужен суперпользователь
+    в self.admin."""
+
+    changelist_models = ()
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelist_queries(self):
+        for model in self.changelist_models:
+            url = (
+                f'/admin/{model._meta.app_label}/{model._meta.model_name}/'
+            )
+            with self.subTest(model=model.__name__):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(
+                    len(queries), admin_changelist_max_queries(),
+                    '\n'.join(query['sql'] for query in queries)
+                )